@@ -0,0 +1,390 @@
+# Benchmarks of the render, fill, shape, import and save hot paths
+#
+#   python benchmarks/bench.py                  # all cases, JSON on stdout
+#   python benchmarks/bench.py -o before.json   # save the results
+#   python benchmarks/bench.py -k fill --compare before.json
+#
+# The renderer is timed against a RecordingScreen (no terminal needed), so
+# the numbers measure pix itself and not the terminal. Results are JSON so
+# runs of different versions can be compared with --compare.
+
+import argparse
+import json
+import os
+import platform
+import random
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from fake_screen import RecordingScreen, fake_curses
+from pix import Canvas
+from pix.tui import RENDER_MODES, Drawing
+
+MIRRORS = {"none": (False, False), "h": (True, False), "v": (False, True), "hv": (True, True)}
+
+
+def measure(run, setup=None, repeat=5):
+    # milliseconds of each run, setup is not timed
+    times = []
+    for _ in range(repeat):
+        if setup:
+            setup()
+        start = time.perf_counter()
+        run()
+        times.append((time.perf_counter() - start) * 1000)
+    return times
+
+
+def result(name, params, times, **extra):
+    entry = {
+        "name": name,
+        "params": params,
+        "repeat": len(times),
+        "min_ms": round(min(times), 4),
+        "median_ms": round(statistics.median(times), 4),
+        "mean_ms": round(statistics.mean(times), 4),
+    }
+    entry.update(extra)
+    return entry
+
+
+def set_palette_size(canvas, count):
+    # palette of exactly `count` colors, black and white first like the default one
+    colors = canvas.colors[:count]
+    while len(colors) < count:
+        color = (random.randint(0, 255), random.randint(0, 255), random.randint(0, 255))
+        if color not in colors:
+            colors.append(color)
+    canvas.colors = colors
+    canvas.initialize_colors()
+
+
+def random_pixels(canvas, count):
+    canvas.pixels = bytearray(random.randrange(count) for _ in range(canvas.width * canvas.height))
+
+
+def sprite_pixels(canvas, count):
+    # rows of same color runs, like pixel art rather than noise
+    pixels = bytearray()
+    while len(pixels) < canvas.width * canvas.height:
+        pixels += bytes([random.randrange(count)]) * random.randint(4, 16)
+    canvas.pixels = pixels[:canvas.width * canvas.height]
+
+
+def bench_display_view(options):
+    results = []
+    for view in options.view_sizes:
+        for palette in options.palette_sizes:
+            screen = RecordingScreen(view + 2, view + 2)
+            drawing = Drawing(screen, width=view, height=view, view_size=view, palette=None)
+            set_palette_size(drawing, palette)
+            random_pixels(drawing, palette)
+            screen.reset()
+            times = measure(drawing.display_view, repeat=options.repeat)
+            calls = {name: count // options.repeat for name, count in screen.calls.items()}
+            results.append(result("display_view", {"view": view, "palette": palette}, times, calls=calls))
+
+            # an incremental frame: the cursor moves one cell inside the view
+            drawing.update_cursor()
+
+            def move():
+                drawing.cursor_x = (drawing.cursor_x + 1) % view
+            screen.reset()
+            times = measure(drawing.update_cursor, setup=move, repeat=options.repeat)
+            calls = {name: count // options.repeat for name, count in screen.calls.items()}
+            results.append(result("update_cursor_move", {"view": view, "palette": palette}, times, calls=calls))
+
+    # the render modes, at the largest view
+    view = options.view_sizes[-1]
+    for mode in RENDER_MODES:
+        screen = RecordingScreen(view + 2, view + 2)
+        drawing = Drawing(screen, width=view, height=view, view_size=view, palette=None, render_mode=mode)
+        set_palette_size(drawing, 64)
+        random_pixels(drawing, 64)
+        screen.reset()
+        times = measure(drawing.display_view, repeat=options.repeat)
+        calls = {name: count // options.repeat for name, count in screen.calls.items()}
+        results.append(result("display_view_mode", {"view": view, "mode": mode}, times, calls=calls,
+                              pairs=len(drawing.pair_cache)))
+
+    # runs of one color become one addstr each
+    for mode in RENDER_MODES:
+        screen = RecordingScreen(view + 2, view + 2)
+        drawing = Drawing(screen, width=view, height=view, view_size=view, palette=None, render_mode=mode)
+        set_palette_size(drawing, 64)
+        sprite_pixels(drawing, 64)
+        screen.reset()
+        times = measure(drawing.display_view, repeat=options.repeat)
+        calls = {name: count // options.repeat for name, count in screen.calls.items()}
+        results.append(result("display_view_sprite", {"view": view, "mode": mode}, times, calls=calls))
+
+    # four layers, the top one half transparent: the view reads the cached
+    # composite, a dot only recomposites its own pixel
+    for layers in (1, 4):
+        screen = RecordingScreen(view + 2, view + 2)
+        drawing = Drawing(screen, width=view, height=view, view_size=view, palette=None)
+        set_palette_size(drawing, 64)
+        random_pixels(drawing, 64)
+        for _ in range(layers - 1):
+            drawing.add_layer()
+            random_pixels(drawing, 64)
+        if layers > 1:
+            drawing.change_layer_opacity(-50)
+        drawing.display_view()
+        times = measure(drawing.display_view, repeat=options.repeat)
+        results.append(result("display_view_layers", {"view": view, "layers": layers}, times))
+
+        def dot():
+            drawing.cursor_x = random.randrange(view)
+            drawing.draw_pixel()
+        times = measure(drawing.update_cursor, setup=dot, repeat=options.repeat)
+        results.append(result("update_cursor_layers", {"view": view, "layers": layers}, times))
+
+    # the truecolor path: drawing plus building the escapes, sent to /dev/null
+    out = os.open(os.devnull, os.O_WRONLY)
+    for mode in ("full", "half"):
+        screen = RecordingScreen(view + 2, view + 2)
+        drawing = Drawing(screen, width=view, height=view, view_size=view, palette=None,
+                          render_mode=mode, truecolor=True)
+        drawing.stdscr.out = out
+        set_palette_size(drawing, 256)
+        random_pixels(drawing, 256)
+
+        def full_frame():
+            drawing.stdscr.clear()
+            drawing.display_view()
+            drawing.refresh_screen()
+        times = measure(full_frame, repeat=options.repeat)
+        results.append(result("display_view_truecolor", {"view": view, "mode": mode}, times,
+                              written=drawing.stdscr.written))
+
+        def move():
+            drawing.cursor_x = (drawing.cursor_x + 1) % view
+        times = measure(drawing.update_cursor, setup=move, repeat=options.repeat)
+        results.append(result("update_cursor_truecolor", {"view": view, "mode": mode}, times,
+                              written=drawing.stdscr.written))
+    os.close(out)
+    return results
+
+
+def maze(width, height, vertical):
+    # one pixel wide serpentine corridor, walls are index 1, the way is 0.
+    # Vertical corridors are the worst case of a scanline fill (one pixel per span).
+    pixels = bytearray(width * height)
+    if vertical:
+        for x in range(1, width, 2):
+            gap = height - 1 if (x // 2) % 2 == 0 else 0
+            for y in range(height):
+                if y != gap:
+                    pixels[y * width + x] = 1
+    else:
+        for y in range(1, height, 2):
+            gap = width - 1 if (y // 2) % 2 == 0 else 0
+            pixels[y * width:(y + 1) * width] = b'\x01' * width
+            pixels[y * width + gap] = 0
+    return pixels
+
+
+def bench_fill(options):
+    results = []
+    for size in options.fill_sizes:
+        for layout in ("open", "maze_rows", "maze_columns"):
+            canvas = Canvas(width=size, height=size, palette=None)
+            if layout == "open":
+                start = bytearray(size * size)
+            else:
+                start = maze(size, size, layout == "maze_columns")
+
+            def setup():
+                canvas.pixels[:] = start
+                canvas.history.clear()
+            times = measure(lambda: canvas.bucket_fill(0, 0, 2), setup=setup, repeat=options.repeat)
+            results.append(result("bucket_fill", {"size": size, "layout": layout}, times))
+    return results
+
+
+def bench_shapes(options):
+    results = []
+    size = options.shape_size
+    for tool in ("rect", "ellipse"):
+        for mirror, (mirror_h, mirror_v) in MIRRORS.items():
+            canvas = Canvas(width=size, height=size, palette=None)
+            canvas.mirror_h, canvas.mirror_v = mirror_h, mirror_v
+            draw = canvas.draw_rect if tool == "rect" else canvas.draw_ellipse
+
+            def run():
+                canvas.reset_rect()
+                canvas.cursor_x, canvas.cursor_y = size // 16, size // 8
+                draw()
+                canvas.cursor_x, canvas.cursor_y = size * 5 // 8, size * 3 // 4
+                draw()
+            times = measure(run, setup=canvas.history.clear, repeat=options.repeat)
+            results.append(result("draw_" + tool, {"size": size, "mirror": mirror}, times))
+    return results
+
+
+def bench_move_block(options):
+    # cut a 100x100 block and paste it elsewhere, as one undo step each
+    results = []
+    size = options.shape_size
+    for tiled in (False, True):
+        canvas = Canvas(width=size, height=size, palette=None, tiled=tiled)
+        canvas.pixels[:] = bytes(random.randrange(24) for _ in range(size * size))
+        start = bytes(canvas.pixels)
+
+        def setup():
+            canvas.pixels[:] = start
+            canvas.history.clear()
+
+        def run():
+            canvas.selection = canvas.merge_spans(canvas.rect_spans(10, 10, 109, 109))
+            canvas.cut_selection()
+            canvas.cursor_x = canvas.cursor_y = size // 2
+            canvas.paste()
+        times = measure(run, setup=setup, repeat=options.repeat)
+        results.append(result("move_block", {"size": size, "tiled": tiled}, times,
+                              undo_ranges=sum(len(delta) for delta, _, _ in canvas.history.undo_stack)))
+    return results
+
+
+def sprite_files(directory):
+    # the examples, a sprite sheet of them and a photo like image with too many colors
+    from PIL import Image
+    examples = sorted(os.path.join(ROOT, "examples", name) for name in os.listdir(os.path.join(ROOT, "examples"))
+                      if name.startswith("example_") and name.endswith(".png"))
+    files = [("example", examples[0])]
+
+    sprites = [Image.open(path).convert('RGB') for path in examples]
+    w, h = sprites[0].size
+    sheet = Image.new('RGB', (w * 8, h * 8))
+    for i in range(64):
+        sheet.paste(sprites[i % len(sprites)], ((i % 8) * w, (i // 8) * h))
+    path = os.path.join(directory, "sheet.png")
+    sheet.save(path)
+    files.append(("sprite_sheet", path))
+
+    noise = Image.frombytes('RGB', (256, 256), bytes(random.randrange(256) for _ in range(256 * 256 * 3)))
+    path = os.path.join(directory, "noise.png")
+    noise.save(path)
+    files.append(("noise", path))
+    return files
+
+
+def bench_load_image(options, directory):
+    results = []
+    for label, path in sprite_files(directory):
+        quantizers = ("median-cut", "octree") if label == "noise" else ("median-cut",)
+        for quantizer in quantizers:
+            canvases = []
+
+            def setup():
+                canvases.append(Canvas(palette=None, quantizer=quantizer))
+            times = measure(lambda: canvases[-1].load_image(path), setup=setup, repeat=options.repeat)
+            canvas = canvases[-1]
+            results.append(result("load_image", {"image": label, "size": canvas.width, "quantizer": quantizer},
+                                  times, colors=len(canvas.colors)))
+    return results
+
+
+def bench_save_image(options, directory):
+    results = []
+    for size in options.save_sizes:
+        drawing = Drawing(RecordingScreen(), width=size, height=size, palette=None)
+        random_pixels(drawing, len(drawing.colors))
+        path = os.path.join(directory, "save.png")
+        times = measure(lambda: drawing.save_image(path, confirm="y"), repeat=options.repeat)
+        results.append(result("save_image", {"size": size}, times))
+    return results
+
+
+def git_version():
+    try:
+        return subprocess.run(["git", "describe", "--always", "--dirty"], cwd=ROOT, capture_output=True,
+                              text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def key(entry):
+    return entry["name"] + " " + json.dumps(entry["params"], sort_keys=True)
+
+
+def compare(old, new):
+    # median of each case against an older run, > 1.0 is slower
+    previous = {key(entry): entry for entry in old["results"]}
+    for entry in new["results"]:
+        before = previous.get(key(entry))
+        if before:
+            ratio = entry["median_ms"] / before["median_ms"] if before["median_ms"] else float("inf")
+            print(f"{key(entry):60} {before['median_ms']:10.3f} -> {entry['median_ms']:10.3f} ms  x{ratio:.2f}",
+                  file=sys.stderr)
+
+
+def parse_options(args=None):
+    parser = argparse.ArgumentParser(description='Pix benchmarks.')
+    parser.add_argument('-o','--output', type=str, help='JSON file for the results (default: stdout).')
+    parser.add_argument('-k','--filter', type=str, default="", help='Only run the benchmarks whose name contains this.')
+    parser.add_argument('-r','--repeat', type=int, default=5, help='Runs of each case (default: 5).')
+    parser.add_argument('--quick', action='store_true', help='Smaller sizes, for a quick check.')
+    parser.add_argument('--compare', type=str, help='Earlier JSON results to compare with.')
+    options = parser.parse_args(args)
+
+    if options.quick:
+        options.view_sizes, options.palette_sizes = (16, 64), (10, 256)
+        options.fill_sizes, options.shape_size, options.save_sizes = (128,), 256, (64,)
+    else:
+        options.view_sizes, options.palette_sizes = (16, 32, 64, 128), (10, 64, 256)
+        options.fill_sizes, options.shape_size, options.save_sizes = (256, 1024), 1024, (64, 512)
+    return options
+
+
+def main():
+    options = parse_options()
+    random.seed(0)
+    benches = [
+        ("display_view", bench_display_view),
+        ("bucket_fill", bench_fill),
+        ("draw_shape", bench_shapes),
+        ("move_block", bench_move_block),
+        ("load_image", bench_load_image),
+        ("save_image", bench_save_image),
+    ]
+    results = []
+    with fake_curses(), tempfile.TemporaryDirectory() as directory:
+        for name, bench in benches:
+            if options.filter not in name:
+                continue
+            if bench in (bench_load_image, bench_save_image):
+                entries = bench(options, directory)
+            else:
+                entries = bench(options)
+            for entry in entries:
+                print(f"{key(entry):60} {entry['median_ms']:10.3f} ms", file=sys.stderr)
+            results += entries
+
+    report = {
+        "version": git_version(),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "repeat": options.repeat,
+        "quick": options.quick,
+        "results": results,
+    }
+    if options.compare:
+        with open(options.compare) as file:
+            compare(json.load(file), report)
+    if options.output:
+        with open(options.output, 'w') as file:
+            json.dump(report, file, indent=2)
+    else:
+        print(json.dumps(report, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,89 @@
+# Stand-in for a curses screen, so the renderer can be timed without a terminal
+
+import curses
+from contextlib import contextmanager
+
+# module functions that need a real terminal (initscr) and what they become
+FAKE_FUNCTIONS = {
+    "start_color": lambda: None,
+    "use_default_colors": lambda: None,
+    "init_color": lambda *args: None,
+    "init_pair": lambda *args: None,
+    "color_pair": lambda n: n << 8,
+    "curs_set": lambda *args: None,
+    "doupdate": lambda: None,
+    "endwin": lambda: None,
+    "setupterm": lambda *args, **kwargs: None,
+    "initscr": lambda: None,
+}
+
+
+@contextmanager
+def fake_curses():
+    """Replace the curses functions that need a terminal while the block runs."""
+    saved = {name: getattr(curses, name) for name in FAKE_FUNCTIONS}
+    for name, function in FAKE_FUNCTIONS.items():
+        setattr(curses, name, function)
+    try:
+        yield
+    finally:
+        for name, function in saved.items():
+            setattr(curses, name, function)
+
+
+class RecordingScreen:
+    """Counts the calls made to it, writes outside of the screen raise curses.error like curses does."""
+
+    def __init__(self, height=200, width=400):
+        self.height = height
+        self.width = width
+        self.calls = {}
+
+    def count(self, name):
+        self.calls[name] = self.calls.get(name, 0) + 1
+
+    def reset(self):
+        self.calls = {}
+
+    def getmaxyx(self):
+        return (self.height, self.width)
+
+    def addch(self, y, x, *args):
+        self.count("addch")
+        if not (0 <= y < self.height and 0 <= x < self.width):
+            raise curses.error("addch() returned ERR")
+
+    def addstr(self, y, x, text, *args):
+        self.count("addstr")
+        if not (0 <= y < self.height and 0 <= x + len(text) <= self.width):
+            raise curses.error("addstr() returned ERR")
+
+    def addnstr(self, y, x, text, n, *args):
+        self.addstr(y, x, text[:n])
+
+    def move(self, y, x):
+        self.count("move")
+
+    def clear(self):
+        self.count("clear")
+
+    def clrtoeol(self):
+        self.count("clrtoeol")
+
+    def erase(self):
+        self.count("erase")
+
+    def refresh(self):
+        self.count("refresh")
+
+    def noutrefresh(self):
+        self.count("noutrefresh")
+
+    def nodelay(self, flag):
+        pass
+
+    def keypad(self, flag):
+        pass
+
+    def getch(self):
+        return -1
@@ -0,0 +1,25 @@
+# Pixel-art Independent of X11 or P.I.X for short
+"""Pix drawing engine.
+
+The canvas, tools, palette and undo history work without a terminal, so
+they can be used from scripts. The curses editor is in pix.tui and is
+started with `python -m pix`.
+"""
+
+from .autosave import Autosave
+from .canvas import Canvas, DEFAULT_SIZE
+from .history import History, DEFAULT_UNDO_BUDGET
+from .palette import ColorMatcher, QUANTIZERS, rgb_to_lab
+from .project import Project
+
+__all__ = [
+    "Autosave",
+    "Canvas",
+    "ColorMatcher",
+    "History",
+    "Project",
+    "QUANTIZERS",
+    "DEFAULT_SIZE",
+    "DEFAULT_UNDO_BUDGET",
+    "rgb_to_lab",
+]
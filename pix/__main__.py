@@ -0,0 +1,150 @@
+# Pixel-art Independent of X11 or P.I.X for short
+# Command line entry point: python -m pix [options] [image]
+
+import argparse
+import curses
+import os
+
+from .autosave import Autosave
+from .canvas import DEFAULT_SIZE
+from .history import DEFAULT_UNDO_BUDGET
+from .palette import ColorMatcher, QUANTIZERS
+from .project import Project
+from .stats import FrameStats
+from .tui import RENDER_MODES, default_keymap, load_keymap, main
+
+# [TODO] :
+# - first argument is file name (for output)
+# - e export to the filename passed or ask for one
+# - Fix the ellipse tool sometime not being pixel accurate.
+# - Command mode for crop, guides, rescaling, precise placement, pattern, effect, hue shift, copy and more
+
+
+def is_valid_img(file_name):
+    if not os.path.isfile(file_name):
+        return False
+
+    from PIL import Image
+    try:
+        with Image.open(file_name) as img:
+            img.verify()  # Verify the file is an image
+        return True
+    except (IOError, SyntaxError):
+        return False
+
+
+def color_count(text):
+    count = int(text)
+    if count < 1:
+        raise argparse.ArgumentTypeError(f"needs at least 1 color, got {count}")
+    return count
+
+
+def build_parser():
+    parser = argparse.ArgumentParser(usage='(w,a,s,d) keys to move the cursor, (e) to export, (0 - 9) change the color, (b) bucket fill, (h,v) mirror pen, (space) toggle pen, (enter) place single pixel, (u) Undo')
+    parser.add_argument('-W','--width', type=int, default=DEFAULT_SIZE, help='Width of the image. (default: '+str(DEFAULT_SIZE)+').')
+    parser.add_argument('-H','--height', type=int, default=DEFAULT_SIZE, help='Height of the image (default; '+str(DEFAULT_SIZE)+').')
+    parser.add_argument('-S','--size', type=int, default=DEFAULT_SIZE, help='Height and Width of the image.')
+    parser.add_argument('-f','--file', type=str, help='File to load.')
+    parser.add_argument('-p','--palette', type=str, help='palette file (default; palette.hex).')
+    parser.add_argument('-T','--tolerance', type=int, default=0, help='Bucket fill color tolerance, as an RGB distance (default: 0).')
+    parser.add_argument('--diagonal-fill', action='store_true', help='Bucket fill also spreads diagonally (8-way).')
+    parser.add_argument('--undo-budget', type=int, default=DEFAULT_UNDO_BUDGET, help='Memory used by the undo history, in bytes (default: '+str(DEFAULT_UNDO_BUDGET)+').')
+    parser.add_argument('--color-metric', choices=ColorMatcher.METRICS, default="rgb", help='How the nearest palette color is found: rgb distance or lab (perceptual) (default: rgb).')
+    parser.add_argument('-c','--colors', type=color_count, default=96, help='Most colors taken from a loaded image (default: 96).')
+    parser.add_argument('-q','--quantizer', choices=QUANTIZERS, default="median-cut", help='How images with more colors are reduced (default: median-cut).')
+    parser.add_argument('-k','--keymap', type=str, help='Keymap file (default: the one saved in the project, or default.key).')
+    parser.add_argument('--project', type=str, help='.pix project file to edit, created from the image or blank canvas if missing.')
+    parser.add_argument('--tiled', action='store_true', help='Store the canvas in tiles created when drawn on, for very large images.')
+    parser.add_argument('--render', choices=list(RENDER_MODES), default="full", help='Pixels per terminal cell: full (1), half (2, with ▀), quadrant (4) or braille (8, overview) (default: full).')
+    parser.add_argument('--truecolor', action='store_true', help='Draw with exact 24-bit colors instead of curses color pairs (needs a terminal that supports it).')
+    parser.add_argument('--stats', action='store_true', help='Show frame timings in the info bar and print a summary on exit.')
+    parser.add_argument('--profile', type=str, help='Also write a cProfile of the session to this file (implies --stats).')
+    parser.add_argument('--script', type=str, help='Run the commands of this file on the images given as arguments, without the editor.')
+    parser.add_argument('-o','--output', type=str, help='Folder the --script results are saved to.')
+    parser.add_argument('-j','--jobs', type=int, help='Processes used by --script (default: one per core).')
+    return parser
+
+
+def run_script(args, inputs):
+    from .script import run_batch
+    if not inputs or not args.output:
+        print("Error: --script needs input images and an output folder (-o).")
+        exit(1)
+    palette = args.palette or ("palette.hex" if os.path.isfile("palette.hex") else None)
+    try:
+        failed = run_batch(args.script, inputs, args.output, jobs=args.jobs, palette=palette,
+                           fill_tolerance=args.tolerance, fill_diagonal=args.diagonal_fill,
+                           color_metric=args.color_metric, import_colors=args.colors, quantizer=args.quantizer,
+                           tiled=args.tiled)
+    except (OSError, ValueError) as e:  # missing or bad script file
+        print(f"Error: {e}")
+        exit(1)
+    if failed:
+        exit(1)
+
+
+def run(argv=None):
+    args, unknown_args = build_parser().parse_known_args(argv)
+
+    if args.script:
+        run_script(args, unknown_args)
+        return
+
+    # A single .pix argument is a project (images are checked below)
+    if len(unknown_args) == 1 and unknown_args[0].endswith('.pix'):
+        args.project = unknown_args.pop()
+
+    # Load keymap from a file, a project remembers the one it was edited with
+    keymap_file = args.keymap
+    if args.project and os.path.exists(args.project):
+        try:
+            keymap_file = keymap_file or Project.stored_keymap(args.project)
+        except (OSError, ValueError) as e:
+            print(f"Error: {e}")
+            exit(1)
+    keymap = load_keymap(keymap_file or "default.key", default_keymap)
+
+    if args.quantizer == "libimagequant":
+        from PIL import features
+        if not features.check_feature("libimagequant"):
+            print("Error: this Pillow was built without libimagequant, use another quantizer.")
+            exit(1)
+
+    # Handle the case where a single argument is passed
+    if len(unknown_args) == 1:
+        potential_file = unknown_args[0]
+        # check if the file exist and is an image
+        if is_valid_img(potential_file):
+            args.file = potential_file
+        else:
+            print(f"Error: '{potential_file}' is not a valid file.")
+            exit(1)
+
+    # An autosave left behind means the last session did not exit cleanly
+    args.recover = False
+    if not args.project and Autosave.exists():
+        answer = input("Found unsaved work from a previous session. Recover it? (Y/n): ").strip()
+        args.recover = answer.lower() != "n"
+
+    # Opt-in instrumentation, summary printed once the terminal is restored
+    args.frame_stats = FrameStats() if args.stats or args.profile else None
+    profiler = None
+    if args.profile:
+        import cProfile
+        profiler = cProfile.Profile()
+    try:
+        if profiler:
+            profiler.runcall(curses.wrapper, main, args, keymap)
+        else:
+            curses.wrapper(main, args, keymap)
+    finally:
+        if profiler:
+            profiler.dump_stats(args.profile)
+            print(f"Profile written to {args.profile}")
+        if args.frame_stats:
+            print(args.frame_stats.summary())
+
+
+if __name__ == "__main__":
+    run()
@@ -0,0 +1,79 @@
+# Animation frames of the canvas and their export
+
+import math
+import os
+
+DEFAULT_FRAME_DURATION = 100  # Milliseconds a frame is shown
+
+
+class Frame:
+    """One frame of the animation: its layer stack and cached composite.
+
+    The canvas works on the layers of the current frame directly, switching
+    frames only swaps these references. active_layer is stored here while
+    another frame is being edited.
+    """
+
+    def __init__(self, layers, composite, duration=DEFAULT_FRAME_DURATION):
+        self.layers = layers
+        self.composite = composite
+        self.active_layer = 0
+        self.duration = duration
+
+
+def palette_of(canvas):
+    palette = []
+    for r, g, b in canvas.colors[:256]:
+        palette.extend((r, g, b))
+    return palette
+
+
+def frame_images(canvas, frames):
+    # a palette image per frame, each one made when the writer asks for it
+    from PIL import Image
+    palette = palette_of(canvas)
+    for frame in frames:
+        image = Image.frombytes('P', (canvas.width, canvas.height), bytes(canvas.frame_view(frame)))
+        image.putpalette(palette)
+        yield image
+
+
+class FrameImages:
+    """The frames as images, made one at a time every time it is iterated.
+
+    The APNG writer goes over append_images twice (sizes first), a
+    generator would be used up after the first pass.
+    """
+
+    def __init__(self, canvas, frames):
+        self.canvas = canvas
+        self.frames = frames
+
+    def __iter__(self):
+        return frame_images(self.canvas, self.frames)
+
+
+def export_animation(canvas, filename):
+    """GIF or APNG (by the extension) of the frames, a sprite sheet for anything else."""
+    extension = os.path.splitext(filename)[1].lower()
+    if extension not in ('.gif', '.apng'):
+        export_sprite_sheet(canvas, filename)
+        return
+    first = next(frame_images(canvas, canvas.frames[:1]))
+    # the other frames are only built while the file is being written
+    first.save(filename, format='GIF' if extension == '.gif' else 'PNG', save_all=True,
+               append_images=FrameImages(canvas, canvas.frames[1:]),
+               duration=[frame.duration for frame in canvas.frames], loop=0)
+
+
+def export_sprite_sheet(canvas, filename):
+    # frames left to right, top to bottom on an (almost) square grid
+    from PIL import Image
+    count = len(canvas.frames)
+    columns = math.ceil(math.sqrt(count))
+    rows = math.ceil(count / columns)
+    sheet = Image.new('P', (columns * canvas.width, rows * canvas.height))
+    sheet.putpalette(palette_of(canvas))
+    for i, image in enumerate(frame_images(canvas, canvas.frames)):
+        sheet.paste(image, ((i % columns) * canvas.width, (i // columns) * canvas.height))
+    sheet.save(filename)
@@ -0,0 +1,243 @@
+# Crash-safe autosave of the canvas
+
+import os
+import queue
+import struct
+import threading
+
+from .tiles import DiffPixels, TiledPixels
+
+class Autosave:
+    """Crash-safe autosave running in a background thread.
+
+    Pixel edits are appended to a journal file and the whole canvas is
+    written to a snapshot file from time to time, after which the journal
+    starts over. The key handling code only queues bytes, all the disk
+    work is done by the worker thread. Recovery loads the snapshot and
+    replays the journal on top of it.
+
+    Snapshot: b'PIXS', width, height, color count (uint32) and the palette
+    as RGB bytes, then the frame count and current frame (uint32) and for
+    every frame its duration, active layer and layer count (uint32). Every
+    layer is LAYER (name length, visible, opacity, tiled), the utf-8 name
+    and its pixels: one palette index per pixel, or for a tiled layer the
+    tile size and count (uint32) and each stored tile as its x, y (uint32)
+    and pixels. Journal: records of layer number (counting the layers of
+    every frame in order), offset, length (uint32) and the new pixel bytes.
+    """
+
+    SNAPSHOT_MAGIC = b'PIXS'
+    HEADER = struct.Struct('<III')
+    RECORD = struct.Struct('<II')
+    FRAME = struct.Struct('<III')
+    LAYER = struct.Struct('<HBBB')
+    JOURNAL = struct.Struct('<III')
+
+    def __init__(self, prefix="pix.save", compact_bytes=1024*1024):
+        self.journal_path = prefix + ".journal"
+        self.snapshot_path = prefix + ".snapshot"
+        # journal size after which a new snapshot is taken (at least one snapshot)
+        self.compact_bytes = compact_bytes
+        self.journaled = 0
+        self.snapshot_size = 0
+        self.queue = queue.Queue()
+        self.thread = threading.Thread(target=self._run, daemon=True)
+        self.thread.start()
+
+    @classmethod
+    def exists(cls, prefix="pix.save"):
+        return os.path.exists(prefix + ".snapshot")
+
+    def snapshot(self, drawing):
+        # every layer of every frame, tiled layers as their stored tiles
+        drawing.frames[drawing.frame_index].active_layer = drawing.active_layer
+        frames = []
+        self.snapshot_size = 0
+        for frame in drawing.frames:
+            layers = []
+            for layer in frame.layers:
+                pixels = self.stored(layer.pixels)
+                self.snapshot_size += len(pixels[1]) * pixels[0] ** 2 if isinstance(pixels, tuple) else len(pixels)
+                layers.append((layer.name, layer.visible, layer.opacity, pixels))
+            frames.append((frame.duration, frame.active_layer, layers))
+        self.queue.put(('snapshot', drawing.width, drawing.height, list(drawing.colors[:256]),
+                        frames, drawing.frame_index))
+        self.journaled = 0
+
+    def stored(self, pixels):
+        # bytes of a layer, or (tile size, {(x, y): pixels}) when it is tiled
+        if isinstance(pixels, DiffPixels):
+            if not isinstance(pixels.base, TiledPixels):
+                return bytes(pixels)
+            # the tiles of the keyframe it was copied from and its own
+            keys = set(pixels.base.tiles) | set(pixels.tiles)
+            return pixels.tile, {key: bytes(pixels.tiles.get(key) or pixels.new_tile(*key)) for key in keys}
+        if isinstance(pixels, TiledPixels):
+            return pixels.tile, pixels.copy_tiles()
+        return bytes(pixels)
+
+    @staticmethod
+    def layer_number(drawing):
+        # position of the active layer among the layers of all the frames
+        return sum(len(frame.layers) for frame in drawing.frames[:drawing.frame_index]) + drawing.active_layer
+
+    def write_rects(self, drawing, rects):
+        # queue the current content of the changed rectangles of the active layer, one record per row
+        records = []
+        width = drawing.width
+        pixels = drawing.pixels
+        for x0, y0, x1, y1 in rects:
+            x0, x1 = max(x0, 0), min(x1, width - 1)
+            y0, y1 = max(y0, 0), min(y1, drawing.height - 1)
+            for y in range(y0, y1 + 1):
+                start = y * width + x0
+                records.append((start, bytes(pixels[start:y * width + x1 + 1])))
+        self.write(drawing, self.layer_number(drawing), records)
+
+    def write(self, drawing, layer, records):
+        records = [record for record in records if record[1]]
+        if not records:
+            return
+        self.queue.put(('write', layer, records))
+        self.journaled += sum(len(data) + self.JOURNAL.size for _, data in records)
+        if self.journaled > max(self.compact_bytes, self.snapshot_size):
+            self.snapshot(drawing)
+
+    def flush(self):
+        # wait until everything queued is on disk
+        self.queue.join()
+
+    def close(self, remove=False):
+        self.queue.put(None)
+        self.thread.join()
+        if remove:
+            for path in (self.journal_path, self.snapshot_path):
+                if os.path.exists(path):
+                    os.remove(path)
+
+    def _run(self):
+        journal = None
+        while True:
+            items = [self.queue.get()]
+            # write everything that is already waiting in one go
+            while True:
+                try:
+                    items.append(self.queue.get_nowait())
+                except queue.Empty:
+                    break
+            running = True
+            for item in items:
+                if item is None:
+                    running = False
+                elif item[0] == 'snapshot':
+                    if journal:
+                        journal.close()
+                    self._write_snapshot(*item[1:])
+                    journal = open(self.journal_path, 'wb')
+                elif journal:
+                    _, layer, records = item
+                    for start, data in records:
+                        journal.write(self.JOURNAL.pack(layer, start, len(data)))
+                        journal.write(data)
+            if journal:
+                journal.flush()
+                os.fsync(journal.fileno())
+            for _ in items:
+                self.queue.task_done()
+            if not running:
+                if journal:
+                    journal.close()
+                return
+
+    def _write_snapshot(self, width, height, colors, frames, frame_index):
+        tmp_path = self.snapshot_path + ".tmp"
+        with open(tmp_path, 'wb') as file:
+            file.write(self.SNAPSHOT_MAGIC)
+            file.write(self.HEADER.pack(width, height, len(colors)))
+            file.write(bytes(channel for color in colors for channel in color))
+            file.write(self.RECORD.pack(len(frames), frame_index))
+            for duration, active_layer, layers in frames:
+                file.write(self.FRAME.pack(duration, active_layer, len(layers)))
+                for name, visible, opacity, pixels in layers:
+                    name = name.encode('utf-8')[:0xffff]
+                    file.write(self.LAYER.pack(len(name), visible, opacity, isinstance(pixels, tuple)))
+                    file.write(name)
+                    if isinstance(pixels, tuple):
+                        tile, tiles = pixels
+                        file.write(self.RECORD.pack(tile, len(tiles)))
+                        for (tx, ty), data in tiles.items():
+                            file.write(self.RECORD.pack(tx, ty))
+                            file.write(data)
+                    else:
+                        file.write(pixels)
+            file.flush()
+            os.fsync(file.fileno())
+        os.replace(tmp_path, self.snapshot_path)
+
+    @classmethod
+    def recover(cls, prefix="pix.save"):
+        """Return (width, height, colors, frames, frame index) from the snapshot and the journal, or None.
+
+        frames are (duration, active layer, layers) and layers (name, visible, opacity, pixels).
+        """
+        try:
+            with open(prefix + ".snapshot", 'rb') as file:
+                data = file.read()
+        except OSError:
+            return None
+        if data[:4] != cls.SNAPSHOT_MAGIC:
+            return None
+        try:
+            width, height, count = cls.HEADER.unpack_from(data, 4)
+            offset = 4 + cls.HEADER.size
+            palette = data[offset:offset + count * 3]
+            colors = [tuple(palette[i:i + 3]) for i in range(0, len(palette), 3)]
+            offset += count * 3
+            frame_count, frame_index = cls.RECORD.unpack_from(data, offset)
+            offset += cls.RECORD.size
+            frames = []
+            planes = []  # every layer's pixels, in journal numbering
+            for _ in range(frame_count):
+                duration, active_layer, layer_count = cls.FRAME.unpack_from(data, offset)
+                offset += cls.FRAME.size
+                layers = []
+                for _ in range(layer_count):
+                    length, visible, opacity, tiled = cls.LAYER.unpack_from(data, offset)
+                    offset += cls.LAYER.size
+                    name = data[offset:offset + length].decode('utf-8', 'replace')
+                    offset += length
+                    if tiled:
+                        tile, tile_count = cls.RECORD.unpack_from(data, offset)
+                        offset += cls.RECORD.size
+                        pixels = TiledPixels(width, height, tile)
+                        for _ in range(tile_count):
+                            tx, ty = cls.RECORD.unpack_from(data, offset)
+                            offset += cls.RECORD.size
+                            pixels.tiles[(tx, ty)] = bytearray(data[offset:offset + tile * tile])
+                            offset += tile * tile
+                    else:
+                        pixels = bytearray(data[offset:offset + width * height])
+                        offset += width * height
+                    if offset > len(data):
+                        return None
+                    layers.append((name, bool(visible), opacity, pixels))
+                    planes.append(pixels)
+                frames.append((duration, active_layer, layers))
+        except struct.error:
+            return None
+        if not frames or frame_index >= len(frames) or not all(layers for _, _, layers in frames):
+            return None
+
+        # Replay the journal, a record cut short by a crash is ignored
+        if os.path.exists(prefix + ".journal"):
+            with open(prefix + ".journal", 'rb') as file:
+                journal = file.read()
+            position = 0
+            while position + cls.JOURNAL.size <= len(journal):
+                layer, start, length = cls.JOURNAL.unpack_from(journal, position)
+                position += cls.JOURNAL.size
+                if position + length > len(journal) or layer >= len(planes) or start + length > width * height:
+                    break
+                planes[layer][start:start + length] = journal[position:position + length]
+                position += length
+        return width, height, colors, frames, frame_index
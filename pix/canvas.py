@@ -0,0 +1,1147 @@
+# Canvas engine: pixels, palette, tools and undo, without any terminal code
+
+import math
+import os
+import re
+from random import randint
+
+from .animation import Frame, export_animation, palette_of
+from .history import History, DEFAULT_UNDO_BUDGET
+from .layers import Composite, Layer
+from .palette import ColorMatcher, quantize_method
+from .project import Project
+from .selection import Clip
+from .tiles import DiffPixels, TiledPixels
+
+DEFAULT_SIZE=32 # Default image size
+FILL_WINDOW=64 # bucket fill scans this many pixels each side of a seed before the whole row
+
+
+class Canvas:
+    """Palette indexed image and the drawing tools.
+
+    Front-ends read view_pixels() and the dirty rectangles after each
+    action and extend initialize_colors, request_redraw and build_actions,
+    pix.tui is the terminal one. `pixels` is the active layer, the one the
+    tools draw on.
+    """
+
+    def __init__(self, width=64, height=64, filename=None, palette="palette.hex",
+                 fill_tolerance=0, fill_diagonal=False, undo_budget=DEFAULT_UNDO_BUDGET, color_metric="rgb",
+                 import_colors=96, quantizer="median-cut", tiled=False):
+
+        self.palette=palette
+        # for line pen:
+        self.rect_pen=False
+        self.tool_id=0
+        self.tool_count=9
+        self.mirror_x_offset=0
+        self.mirror_y_offset=0
+        # for load_image: most colors added to the palette, and how images with more are reduced
+        self.import_colors=import_colors
+        self.quantizer=quantizer
+        # most palette colors, a front-end that shows fewer lowers it in initialize_colors
+        self.max_colors=256
+        # for bucket fill: RGB distance still counted as the same color, and 8-way fill
+        self.fill_tolerance=fill_tolerance
+        self.fill_diagonal=fill_diagonal
+        # for x2 and y2 you could use cursor_x and cursor_y I think.
+        self.x1=self.x2=self.y1=self.y2=-1     
+        self.filename = filename
+        self.width = width
+        self.height = height
+        # What changed since the front-end last looked: canvas rectangles to
+        # repaint and the ones whose pixels changed, or the whole canvas
+        self.full_redraw = True
+        self.dirty_rects = []
+        self.changed_rects = []
+        # Background autosave, set up by the front-end
+        self.autosave = None
+        # Open .pix project, its pixels are mapped from the file (see open_project)
+        self.project = None
+        # Canvas is stored as palette indexes (one byte per pixel, row major),
+        # RGB is only produced when the image is saved. Tiled canvases keep
+        # them in lazily created tiles instead, for very large images.
+        self.tiled = tiled
+        # Layers, active layer and composite are those of the current animation frame
+        self.reset_layers(self.new_pixels())
+        self.cursor_x = width // 2
+        self.cursor_y = height // 2
+        self.color = (255, 255, 255)  # Default color white
+        self.color_pair = 1
+        self.mirror_h = False
+        self.mirror_v = False
+        self.history = History(undo_budget)
+
+        self.tools = ["Dot","Pen","Bucket","Line","Rect","Ellipse","Copy","Select","Lasso","Stamp"]
+        # Selection tools: the selected area as (y, x0, x1) spans, the lasso
+        # path being drawn, the copied pixels (a Clip) and where the stamp
+        # tool last pasted them
+        self.clipboard = None
+        self.lasso = []
+        self.stamped = None
+        self.actions = self.build_actions()
+        
+        self.colors = [
+            (0, 0, 0),       # Black
+            (255, 255, 255), # White
+            (255, 0, 0),     # Red
+            (0, 255, 0),     # Green
+            (0, 0, 255),     # Blue
+            (255, 255, 0),   # Yellow
+            (255, 165, 0),   # Orange
+            (128, 0, 128),   # Purple
+            (0, 255, 255),   # Cyan
+            (255, 192, 203)  # Pink
+        ]
+
+        #NOTE: too slow to run
+        # Add random unique colors until we reach 254 total colors
+#        while len(self.colors) < 254:
+#            random_color = (randint(0, 255), randint(0, 255), randint(0, 255))
+#            if random_color not in self.colors:
+#                self.colors.append(random_color)
+
+        # NOTE: Add some random colors to the default pallet to expend it a little
+        suported_colors=24
+        while len(self.colors) < suported_colors:
+            random_color = (randint(0, 255), randint(0, 255), randint(0, 255))
+            if random_color not in self.colors:
+                self.colors.append(random_color)
+
+        if self.palette and self.valid_palette(self.palette):
+            self.load_rgb_from_file(self.palette)
+        self.color_pairs = {}
+        self.matcher = ColorMatcher(self.colors, color_metric)
+        self.initialize_colors()
+        self.pen_down = False  # Initialize pen state
+        self.set_color(1)
+
+        if filename:
+            self.load_image(filename)
+
+    @property
+    def pixels(self):
+        # the active layer, every tool draws on it
+        return self.layers[self.active_layer].pixels
+
+    @pixels.setter
+    def pixels(self, pixels):
+        self.layers[self.active_layer].pixels = pixels
+
+    def view_pixels(self):
+        """Palette indexes of the image as shown, the layers flattened."""
+        return self.frame_view(self.frames[self.frame_index])
+
+    def frame_view(self, frame):
+        layer = frame.layers[0]
+        if len(frame.layers) == 1 and layer.visible and layer.opacity >= 100:
+            frame.composite.reset()
+            return layer.pixels  # nothing to blend
+        return frame.composite.update()
+
+    def reset_layers(self, pixels):
+        # a new image: one frame with one layer holding `pixels`
+        self.layers = [Layer("Background", pixels)]
+        self.active_layer = 0
+        # the visible layers flattened, only used when there is something to blend
+        self.composite = Composite(self, self.layers)
+        self.frames = [Frame(self.layers, self.composite)]
+        self.frame_index = 0
+        self.selection = None
+
+    def new_pixels(self, data=None):
+        # pixel buffer of the canvas size, blank or holding `data`
+        if self.tiled:
+            if data is None:
+                return TiledPixels(self.width, self.height)
+            return TiledPixels.from_bytes(self.width, self.height, data)
+        if data is None:
+            return bytearray(self.width * self.height)
+        return bytearray(data)
+
+    def stored_ranges(self):
+        # flat ranges that can hold non blank pixels: everything, or the tiles
+        if isinstance(self.pixels, TiledPixels):
+            return self.pixels.ranges()
+        return [(0, len(self.pixels))]
+
+    def valid_palette(self,palette_file):
+        # Check if file exists
+        if not os.path.isfile(palette_file):
+            print(f"File '{palette_file}' does not exist.")
+            return False
+
+        valid_hex_pattern = re.compile(r'^#?[0-9a-fA-F]{6}$')
+        valid_hex_count = 0
+
+        # Open and read the file line by line
+        with open(palette_file, 'r') as file:
+            for line in file:
+                line = line.strip()
+                if valid_hex_pattern.match(line):
+                    valid_hex_count += 1
+
+        # Check if there are at least 8 valid hex color values
+        if valid_hex_count >= 8:
+            return True
+        else:
+            raise ValueError(f"File '{palette_file}' does not have enough valid hex color values.")
+
+    def hex_to_rgb(self,hex_color):
+        """Convert a hex color to an RGB tuple."""
+        hex_color = hex_color.lstrip('#')
+        return tuple(int(hex_color[i:i+2], 16) for i in (0, 2, 4))
+
+    def load_rgb_from_file(self,filename):
+        # init default colors
+
+        """Load hex colors from a file and convert them to RGB."""
+        # Replace the 8 last color of the colors array with those in the file
+        with open(filename, 'r') as file:
+            for i, line in enumerate(file):
+                hex_color = line.strip()
+                rgb_tuple = self.hex_to_rgb(hex_color)
+                self.colors[i+2] = rgb_tuple
+
+    def initialize_colors(self):
+        # palette index -> color pair number, front-ends set up their colors on top of this
+        self.color_pairs = {i: i + 1 for i in range(len(self.colors))}
+        # the palette changed, so do the cached nearest colors
+        self.matcher.set_palette(self.colors)
+        for frame in self.frames:
+            frame.composite.reset()  # blended colors change with the palette
+        if self.project:
+            self.project.write_palette(self.colors)
+
+    def move_cursor(self, direction, step=1):
+        if direction == 'UP':
+            self.cursor_y = (self.cursor_y - step) % self.height
+        elif direction == 'DOWN':
+            self.cursor_y = (self.cursor_y + step) % self.height
+        elif direction == 'LEFT':
+            self.cursor_x = (self.cursor_x - step) % self.width
+        elif direction == 'RIGHT':
+            self.cursor_x = (self.cursor_x + step) % self.width
+
+    def set_color(self, color_key):
+        self.color = self.colors[int(color_key)]
+        self.color_pair = self.color_pairs[int(color_key)]
+
+    def set_palette(self, color_key):
+        if (int(color_key) <= 1):
+            self.color = self.colors[int(color_key)]
+            self.color_pair = self.color_pairs[int(color_key)]
+        else :
+            index=int(len(self.colors)-10)+int(color_key)
+            self.color = self.colors[index]
+            self.color_pair = self.color_pairs[index]
+
+    def increase_color(self):
+        colors_count=int(len(self.colors))
+        if self.color_pair < colors_count:
+            self.color = self.colors[self.color_pair]
+            self.color_pair+=1
+        else:
+            self.color_pair=1
+            self.color = self.colors[self.color_pair]
+
+    def decrease_color(self):
+        colors_count=int(len(self.colors))
+        if self.color_pair > 1:
+            self.color_pair-=1
+            self.color = self.colors[self.color_pair-1]
+        else:
+            self.color_pair=colors_count
+
+    def draw_pixel(self):
+        index = self.color_pair - 1
+        self.put_pixel(self.cursor_x, self.cursor_y, index)
+        self.mark_dirty(self.cursor_x, self.cursor_y, self.cursor_x, self.cursor_y)
+        if self.mirror_h:
+            mx=self.width + self.mirror_x_offset - 1 - self.cursor_x
+            if (0 <= mx < self.width):
+                self.put_pixel(mx, self.cursor_y, index)
+                self.mark_dirty(mx, self.cursor_y, mx, self.cursor_y)
+        if self.mirror_v:
+            my=self.height +self.mirror_y_offset - 1 - self.cursor_y
+            if (0 <= my < self.height):
+                self.put_pixel(self.cursor_x, my, index)
+                self.mark_dirty(self.cursor_x, my, self.cursor_x, my)
+        if self.mirror_h and self.mirror_v:
+            my=self.height +self.mirror_y_offset - 1 - self.cursor_y
+            mx=self.width + self.mirror_x_offset - 1 - self.cursor_x
+            if (0 <= mx < self.width) and (0 <= my < self.height):
+                self.put_pixel(mx, my, index)
+                self.mark_dirty(mx, my, mx, my)
+
+    def set_pixel(self,x,y,index=-1):
+        if index == -1:
+            index=self.color_pair - 1
+        w = self.width
+        self.put_pixel(x, y, index)
+        if self.mirror_h:
+            self.put_pixel(w - 1 - x, y, index)
+        if self.mirror_v:
+            self.put_pixel(x, self.height - 1 - y, index)
+        if self.mirror_h and self.mirror_v:
+            self.put_pixel(w - 1 - x, self.height - 1 - y, index)
+
+    def put_pixel(self, x, y, index):
+        # every canvas write goes through here (or a span write) so it can be undone
+        offset = y * self.width + x
+        self.history.record(self.pixels, offset, offset + 1)
+        self.pixels[offset] = index
+
+    def get_pixel(self,x,y):
+        return self.colors[self.pixels[y * self.width + x]]
+
+    def pick_pixel(self):
+        index = self.pixels[self.cursor_y * self.width + self.cursor_x]
+        self.color = self.colors[index]
+        self.color_pair = self.color_pairs[index]
+
+    def get_image(self):
+        """Build an RGB PIL image from the palette indexes (used for saving)."""
+        from PIL import Image
+        image = Image.frombytes('P', (self.width, self.height), bytes(self.view_pixels()))
+        image.putpalette(palette_of(self))
+        return image.convert('RGB')
+
+    # Shape rasterization, shared by the drawing tools and the tool preview.
+    # Shapes are lists of horizontal spans (y, x_start, x_end), inclusive,
+    # so they can be written with one slice assignment per span.
+
+    def rect_spans(self, x1, y1, x2, y2):
+        x1, x2 = sorted([x1, x2])
+        y1, y2 = sorted([y1, y2])
+        return [(y, x1, x2) for y in range(y1, y2 + 1)]
+
+    def ellipse_spans(self, x1, y1, x2, y2, filled=False):
+        # Swap coordinates if needed
+        x1, x2 = sorted([x1, x2])
+        y1, y2 = sorted([y1, y2])
+
+        # If any of the values are <= 2, draw a rectangle instead
+        if (x2 - x1) < 2 or (y2 - y1) < 2:
+            return self.rect_spans(x1, y1, x2, y2)
+
+        # Ellipse drawing using Bresenham's algorithm
+        center_x = (x1 + x2) // 2
+        center_y = (y1 + y2) // 2
+        radius_x = (x2 - x1) // 2
+        radius_y = (y2 - y1) // 2
+
+        # Bresenham's ellipse algorithm variables
+        a2 = radius_x * radius_x
+        b2 = radius_y * radius_y
+        two_a2 = 2 * a2
+        two_b2 = 2 * b2
+        x = 0
+        y = radius_y
+        dx = two_b2 * x
+        dy = two_a2 * y
+        err = a2 * (1 - 2 * radius_y)
+
+        spans = []
+        points = []
+        while y >= 0 and x <= radius_x:
+            # Draw the ellipse in all four quadrants
+            if filled:
+                spans.append((center_y + y, center_x - x, center_x + x))
+                spans.append((center_y - y, center_x - x, center_x + x))
+            else:
+                # Outline with 1-pixel thickness
+                points.append((center_x + x, center_y + y))
+                points.append((center_x - x, center_y - y))
+                points.append((center_x + x, center_y - y))
+                points.append((center_x - x, center_y + y))
+
+            if err <= 0:
+                x += 1
+                dx += two_b2
+                err += dx + b2
+            if err > 0:
+                y -= 1
+                dy -= two_a2
+                err += a2 - dy
+        return spans + self.points_to_spans(points)
+
+    def line_spans(self, x1, y1, x2, y2):
+        dx = abs(x2 - x1)
+        dy = abs(y2 - y1)
+        sx = 1 if x1 < x2 else -1
+        sy = 1 if y1 < y2 else -1
+        err = dx - dy
+
+        points = []
+        while True:
+            points.append((x1, y1))
+            if x1 == x2 and y1 == y2:
+                break
+            e2 = err * 2
+            if e2 > -dy:
+                err -= dy
+                x1 += sx
+            if e2 < dx:
+                err += dx
+                y1 += sy
+        return self.points_to_spans(points)
+
+    def points_to_spans(self, points):
+        # join neighbour pixels of the same row into spans
+        spans = []
+        for x, y in sorted(set(points), key=lambda point: (point[1], point[0])):
+            if spans and spans[-1][0] == y and spans[-1][2] == x - 1:
+                spans[-1] = (y, spans[-1][1], x)
+            else:
+                spans.append((y, x, x))
+        return spans
+
+    def shape_spans(self, tool_id):
+        # spans of the pending line/rect/ellipse from (x1, y1) to the cursor
+        if tool_id == 3:
+            return self.line_spans(self.x1, self.y1, self.cursor_x, self.cursor_y)
+        if tool_id == 4:
+            return self.rect_spans(self.x1, self.y1, self.cursor_x, self.cursor_y)
+        if tool_id == 5:
+            return self.ellipse_spans(self.x1, self.y1, self.cursor_x, self.cursor_y)
+        return []
+
+    def mirror_spans(self, spans):
+        # the spans set_pixel mirroring would write, mirrored copies included
+        w, h = self.width, self.height
+        mirrored = list(spans)
+        if self.mirror_h:
+            mirrored += [(y, w - 1 - x1, w - 1 - x0) for y, x0, x1 in spans]
+        if self.mirror_v:
+            mirrored += [(h - 1 - y, x0, x1) for y, x0, x1 in spans]
+        if self.mirror_h and self.mirror_v:
+            mirrored += [(h - 1 - y, w - 1 - x1, w - 1 - x0) for y, x0, x1 in spans]
+        return mirrored
+
+    def lasso_spans(self, points):
+        # the inside of the closed path (even-odd, at the pixel centers) and the path itself
+        if not points:
+            return []
+        edges = list(zip(points, points[1:] + points[:1]))
+        spans = [span for (x0, y0), (x1, y1) in edges for span in self.line_spans(x0, y0, x1, y1)]
+        ys = [y for _, y in points]
+        for y in range(min(ys), max(ys) + 1):
+            crossings = sorted(x0 + (y - y0) * (x1 - x0) / (y1 - y0) for (x0, y0), (x1, y1) in edges
+                               if y0 <= y < y1 or y1 <= y < y0)
+            for left, right in zip(crossings[::2], crossings[1::2]):
+                spans.append((y, math.ceil(left), math.floor(right)))
+        return self.merge_spans(spans)
+
+    def merge_spans(self, spans):
+        # spans clipped to the canvas, sorted, overlapping and touching ones joined
+        merged = []
+        for y, x0, x1 in sorted(spans):
+            x0, x1 = max(x0, 0), min(x1, self.width - 1)
+            if not 0 <= y < self.height or x0 > x1:
+                continue
+            if merged and merged[-1][0] == y and x0 <= merged[-1][2] + 1:
+                merged[-1] = (y, merged[-1][1], max(merged[-1][2], x1))
+            else:
+                merged.append((y, x0, x1))
+        return merged
+
+    def outline_spans(self, spans):
+        # border pixels of an area: span ends and what isn't covered both above and below
+        rows = {}
+        for y, x0, x1 in spans:
+            rows.setdefault(y, []).append((x0, x1))
+        outline = []
+        for y, row in rows.items():
+            inside = [(max(a0, b0), min(a1, b1)) for a0, a1 in rows.get(y - 1, []) for b0, b1 in rows.get(y + 1, [])]
+            for x0, x1 in row:
+                x = x0
+                for i0, i1 in sorted((max(i0, x0 + 1), min(i1, x1 - 1)) for i0, i1 in inside):
+                    if i0 > i1:
+                        continue
+                    if i0 > x:
+                        outline.append((y, x, i0 - 1))
+                    x = max(x, i1 + 1)
+                if x <= x1:
+                    outline.append((y, x, x1))
+        return outline
+
+    def selecting_spans(self):
+        # outline of the selection being made, the rectangle or the lasso path so far
+        if self.tool_id == 7:
+            return self.outline_spans(self.rect_spans(self.x1, self.y1, self.cursor_x, self.cursor_y))
+        if self.tool_id == 8 and self.lasso:
+            return self.points_to_spans(self.lasso)
+        return []
+
+    def fill_spans(self, spans, index=-1):
+        # bulk write, one recorded slice assignment per span
+        if index == -1:
+            index=self.color_pair - 1
+        fill_byte = bytes([index])
+        pixels = self.pixels
+        for y, x0, x1 in spans:
+            start = y * self.width + x0
+            self.history.record(pixels, start, start + x1 - x0 + 1)
+            pixels[start:start + x1 - x0 + 1] = fill_byte * (x1 - x0 + 1)
+
+    def draw_shape(self, spans):
+        self.fill_spans(self.mirror_spans(spans))
+        x1, x2 = sorted([self.x1, self.cursor_x])
+        y1, y2 = sorted([self.y1, self.cursor_y])
+        self.mark_dirty_mirrored(x1, y1, x2, y2)
+        self.reset_rect()
+
+    def draw_rect(self):
+        if self.pen_down:
+            self.draw_shape(self.rect_spans(self.x1, self.y1, self.cursor_x, self.cursor_y))
+        else:
+            self.x1, self.y1 = self.cursor_x, self.cursor_y
+            self.pen_down = True
+
+    def draw_ellipse(self, filled=False):
+        if self.pen_down:
+            self.draw_shape(self.ellipse_spans(self.x1, self.y1, self.cursor_x, self.cursor_y, filled))
+        else:
+            self.x1, self.y1 = self.cursor_x, self.cursor_y
+            self.pen_down = True
+
+    def draw_line(self):
+        if self.pen_down:
+            self.draw_shape(self.line_spans(self.x1, self.y1, self.cursor_x, self.cursor_y))
+        else:
+            self.x1, self.y1 = self.cursor_x, self.cursor_y
+            self.pen_down = True
+
+    def reset_rect(self):
+        self.pen_down = False
+        self.x1 = self.x2 = self.y1 = self.y2 = 0
+
+    # Selection and clipboard: the tools copy, cut and paste blocks of the
+    # active layer one row (or one lasso run) slice at a time, so a move is
+    # a few slice copies and its undo step a range per row.
+
+    def select_rect(self):
+        if self.pen_down:
+            self.selection = self.merge_spans(self.rect_spans(self.x1, self.y1, self.cursor_x, self.cursor_y))
+            self.reset_rect()
+        else:
+            self.x1, self.y1 = self.cursor_x, self.cursor_y
+            self.pen_down = True
+
+    def select_lasso(self):
+        if self.pen_down:
+            self.selection = self.lasso_spans(self.lasso) or None
+            self.lasso = []
+            self.pen_down = False
+        else:
+            self.lasso = []  # the cursor positions are added by pen_step()
+            self.pen_down = True
+
+    def clear_selection(self):
+        self.selection = None
+
+    def copy_selection(self):
+        if self.selection:
+            self.clipboard, _ = Clip.from_spans(self.pixels, self.width, self.selection)
+
+    def cut_selection(self):
+        if not self.selection:
+            return
+        self.begin_action()
+        self.copy_selection()
+        self.fill_spans(self.selection, 0)
+        self.mark_spans(self.selection)
+        self.begin_action()
+
+    def paste(self):
+        # one undo step, the clipboard's top left corner at the cursor
+        if not self.clipboard:
+            return
+        self.begin_action()
+        self.paste_at(self.cursor_x, self.cursor_y)
+        self.begin_action()
+
+    def paste_at(self, x, y):
+        clip = self.clipboard
+        pixels = self.pixels
+        left, right = max(x, 0), min(x + clip.width, self.width)
+        top, bottom = max(y, 0), min(y + clip.height, self.height)
+        if left >= right or top >= bottom:
+            return
+        for row in range(top - y, bottom - y):
+            offset = (y + row) * self.width + x
+            source = row * clip.width
+            for x0, x1 in clip.runs(row):
+                x0, x1 = max(x0, left - x), min(x1, right - x)
+                if x0 < x1:
+                    self.history.record(pixels, offset + x0, offset + x1)
+                    pixels[offset + x0:offset + x1] = clip.data[source + x0:source + x1]
+        self.mark_dirty(left, top, right - 1, bottom - 1)
+
+    def flip_clipboard_horizontal(self):
+        if self.clipboard:
+            self.clipboard = self.clipboard.flipped_horizontal()
+
+    def flip_clipboard_vertical(self):
+        if self.clipboard:
+            self.clipboard = self.clipboard.flipped_vertical()
+
+    def rotate_clipboard(self):
+        if self.clipboard:
+            self.clipboard = self.clipboard.rotated()
+
+    def mark_spans(self, spans):
+        # repaint the bounding box of spans
+        self.mark_dirty(min(span[1] for span in spans), spans[0][0],
+                        max(span[2] for span in spans), spans[-1][0])
+
+    def pen_step(self):
+        # after every key while the pen is down: the pen draws, the lasso
+        # collects the path and the stamp pastes the clipboard where the cursor went
+        if self.tool_id == 1: # PEN
+            self.draw_pixel()
+        elif self.tool_id == 8: # LASSO
+            if not self.lasso or self.lasso[-1] != (self.cursor_x, self.cursor_y):
+                self.lasso.append((self.cursor_x, self.cursor_y))
+        elif self.tool_id == 9 and self.clipboard: # STAMP
+            if self.stamped != (self.cursor_x, self.cursor_y):
+                self.stamped = (self.cursor_x, self.cursor_y)
+                self.paste_at(self.cursor_x, self.cursor_y)
+
+    def bucket_fill(self, x, y, new_index):
+        if not (0 <= x < self.width and 0 <= y < self.height):
+            return
+        old_index = self.pixels[y * self.width + x]
+        if old_index == new_index:
+            return
+
+        # Palette indexes that count as the old color (within the fill tolerance)
+        fillable = bytearray(256)
+        old_r, old_g, old_b = self.colors[old_index]
+        for i, (r, g, b) in enumerate(self.colors[:256]):
+            if (r - old_r) ** 2 + (g - old_g) ** 2 + (b - old_b) ** 2 <= self.fill_tolerance ** 2:
+                fillable[i] = 1
+
+        # The mirrored seeds are filled in the same pass
+        seeds = [(x, y)]
+        if self.mirror_h:
+            seeds.append((self.width - 1 - x, y))
+        if self.mirror_v:
+            seeds.append((x, self.height - 1 - y))
+        if self.mirror_h and self.mirror_v:
+            seeds.append((self.width - 1 - x, self.height - 1 - y))
+        self._bucket_fill(seeds, fillable, new_index)
+
+    def _bucket_fill(self, seeds, fillable, new_index):
+        # Scanline fill: rows are turned into 0/1 masks with bytes.translate,
+        # spans are found with find/rfind and filled with one slice assignment,
+        # then the rows above and below are searched for new spans. The new
+        # color can be within the tolerance, so the filled pixels are kept in
+        # `done` (a row is allocated when the fill reaches it) and not in the mask.
+        pixels = self.pixels
+        width, height = self.width, self.height
+        fillable = bytes(fillable)
+        reach = 1 if self.fill_diagonal else 0
+        fill_byte = bytes([new_index])
+        done = [None] * height
+        min_x, min_y, max_x, max_y = width, height, -1, -1
+        stack = [seed for seed in seeds if 0 <= seed[0] < width and 0 <= seed[1] < height]
+        while stack:
+            x, y = stack.pop()
+            row = y * width
+            done_row = done[y]
+            if done_row is None:
+                done_row = done[y] = bytearray(width)
+            elif done_row[x]:
+                continue
+            # translate only a window around the seed, the whole row only if the run leaves it
+            lo, hi = max(x - FILL_WINDOW, 0), min(x + FILL_WINDOW + 1, width)
+            mask = pixels[row + lo:row + hi].translate(fillable)
+            if not mask[x - lo]:
+                continue
+            left = mask.rfind(0, 0, x - lo)
+            right = mask.find(0, x - lo)
+            if (left == -1 and lo) or (right == -1 and hi < width):
+                mask = pixels[row:row + width].translate(fillable)
+                left = mask.rfind(0, 0, x) + 1
+                right = mask.find(0, x)
+                right = width if right == -1 else right
+            else:
+                left += lo + 1
+                right = width if right == -1 else lo + right
+
+            # every part of the run not filled yet, they all touch the region through the filled parts
+            span_left = done_row.find(0, left, right)
+            while span_left != -1:
+                span_right = done_row.find(1, span_left, right)
+                span_right = right if span_right == -1 else span_right
+                self.history.record(pixels, row + span_left, row + span_right)
+                pixels[row + span_left:row + span_right] = fill_byte * (span_right - span_left)
+                done_row[span_left:span_right] = b'\x01' * (span_right - span_left)
+                min_x, max_x = min(min_x, span_left), max(max_x, span_right - 1)
+                min_y, max_y = min(min_y, y), max(max_y, y)
+
+                # Push one seed per fillable run in the neighbour rows, on its first pixel not filled yet
+                scan_left = max(span_left - reach, 0)
+                scan_right = min(span_right + reach, width)
+                for ny in (y - 1, y + 1):
+                    if not 0 <= ny < height:
+                        continue
+                    nrow = ny * width
+                    ndone = done[ny]
+                    nmask = pixels[nrow + scan_left:nrow + scan_right].translate(fillable)
+                    start = nmask.find(1)
+                    while start != -1:
+                        end = nmask.find(0, start)
+                        end = len(nmask) if end == -1 else end
+                        seed = scan_left + start if ndone is None else ndone.find(0, scan_left + start,
+                                                                                  scan_left + end)
+                        if seed != -1:
+                            stack.append((seed, ny))
+                        start = nmask.find(1, end)
+                span_left = done_row.find(0, span_right, right)
+        if max_x >= 0:
+            self.mark_dirty(min_x, min_y, max_x, max_y)
+
+    def request_redraw(self):
+        # the whole canvas changed (undo, palette, new image), front-ends repaint everything
+        self.full_redraw = True
+
+    def mark_dirty(self, x0, y0, x1, y1, changed=True):
+        # canvas rectangle (inclusive) to repaint on the next frame,
+        # changed is False when the pixels themselves did not change (cursor, preview)
+        self.dirty_rects.append((x0, y0, x1, y1))
+        if changed:
+            self.changed_rects.append((x0, y0, x1, y1))
+            self.composite.invalidate(x0, y0, x1, y1)
+
+    def mark_dirty_mirrored(self, x0, y0, x1, y1, changed=True):
+        # same as mark_dirty but also marks the rectangles written by set_pixel mirroring
+        self.mark_dirty(x0, y0, x1, y1, changed)
+        if self.mirror_h:
+            self.mark_dirty(self.width - 1 - x1, y0, self.width - 1 - x0, y1, changed)
+        if self.mirror_v:
+            self.mark_dirty(x0, self.height - 1 - y1, x1, self.height - 1 - y0, changed)
+        if self.mirror_h and self.mirror_v:
+            self.mark_dirty(self.width - 1 - x1, self.height - 1 - y1, self.width - 1 - x0, self.height - 1 - y0, changed)
+
+    # Could get less compression with higher resolution but that's good enaugh for pixel art, it's some between 128 and 64
+    # If I implement a config file system that's the kind of stuff you could tweek in the pixrc file
+    def load_image(self, filename, resolution=None, quantizer=None):
+        resolution = min(self.import_colors if resolution is None else resolution, self.max_colors)
+        quantizer = quantizer or self.quantizer
+        from PIL import Image
+        with Image.open(filename) as img:
+            img.load()
+            # Pixel art usually has few colors already: palette images and images
+            # with no more than `resolution` colors are read as they are.
+            if not (img.mode == 'P' and len(img.getcolors(256)) <= resolution):
+                img = img.convert('RGB')
+                if img.getcolors(resolution) is None:
+                    img = img.quantize(colors=resolution, method=quantize_method(quantizer))
+
+        self.width, self.height = img.size
+        self.cursor_x = self.width // 2
+        self.cursor_y = self.height // 2
+
+        # (count, color) of the colors used, most common first
+        if img.mode == 'P':
+            palette = img.getpalette('RGB')
+            used = [(count, tuple(palette[i * 3:i * 3 + 3])) for count, i in img.getcolors(256)]
+        else:
+            used = img.getcolors(resolution)
+        used.sort(key=lambda entry: entry[0], reverse=True)
+
+        # Append unique colors to palette
+        known = set(self.colors)
+        for _, color in used:
+            if color not in known and len(self.colors) < self.max_colors:
+                known.add(color)
+                self.colors.append(color)
+
+        self.initialize_colors()
+        # Convert the image to palette indexes once
+        if img.mode == 'P':
+            # image palette index -> our palette index, applied with bytes.translate
+            lut = bytearray(256)
+            for i in range(len(palette) // 3):
+                lut[i] = self.matcher.match(tuple(palette[i * 3:i * 3 + 3]))
+            self.reset_layers(self.new_pixels(img.tobytes().translate(lut)))
+        else:
+            self.reset_layers(self.new_pixels(self.matcher.match_image(img)))
+        self.history.clear()
+        self.request_redraw()
+
+    def export_image(self, filename):
+        if len(self.frames) > 1:
+            export_animation(self, filename)
+        else:
+            self.get_image().save(filename)
+
+    def export_palette(self, filename):
+        """Write up to 8 palette colors, black and white left out, to a .hex file."""
+        # Define colors to ignore
+        colors_to_ignore = [(0, 0, 0), (255, 255, 255)]  # Black and White
+
+        # Filter out the colors we want to ignore
+        filtered_colors = [color for color in self.colors if color not in colors_to_ignore]
+
+        # Ensure we only export up to 8 colors, even after filtering
+        colors_to_export = filtered_colors[:8]
+
+        with open(filename, 'w') as file:
+            for color in colors_to_export:
+                # Convert RGB to hexadecimal format
+                hex_color = "#{:02X}{:02X}{:02X}".format(color[0], color[1], color[2])
+                file.write(f"{hex_color}\n")
+
+    def set_palette_color(self, index, color):
+        # replace a palette color, the pixels using it change with it
+        self.color = color
+        self.colors[index] = color
+        self.initialize_colors()
+        self.request_redraw()
+        if self.autosave:
+            self.autosave.snapshot(self)
+
+    def add_color(self, color):
+        """Palette index of an RGB color, added to the palette when it is missing."""
+        if color in self.colors:
+            return self.colors.index(color)
+        if len(self.colors) >= self.max_colors:
+            return self.matcher.match(color)  # palette full, nearest color
+        self.colors.append(color)
+        self.initialize_colors()
+        return len(self.colors) - 1
+
+    def clear_image(self):
+        # reset the canvas to blank, as one undo step
+        self.begin_action()
+        for start, end in self.stored_ranges():
+            self.history.record(self.pixels, start, end)
+        if self.project:
+            self.pixels[:] = bytes(len(self.pixels))  # blanked in place, in the file
+        else:
+            blank = self.new_pixels()  # Reset canvas to blank state
+            self.history.rebind(self.pixels, blank)
+            self.pixels = blank
+        self.begin_action()
+        if self.autosave:
+            self.autosave.snapshot(self)
+        self.pen_down = False
+        self.cursor_x = self.width // 2
+        self.cursor_y = self.height // 2
+        self.request_redraw()
+
+    def build_actions(self):
+        """Keymap action name -> method, an action returning False quits."""
+        actions = {
+            "move_up": lambda: self.move_cursor('UP'),
+            "move_down": lambda: self.move_cursor('DOWN'),
+            "move_left": lambda: self.move_cursor('LEFT'),
+            "move_right": lambda: self.move_cursor('RIGHT'),
+            "perform_action": self.perform_action,
+            "undo_action": self.undo,
+            "redo_action": self.redo,
+            "increase_color": self.increase_color,
+            "decrease_color": self.decrease_color,
+            "next_tool": self.next_tool,
+            "previous_tool": self.previous_tool,
+            "bucket_fill": self.fill_at_cursor,
+            "toggle_horizontal_mirroring": self.toggle_horizontal_mirroring,
+            "toggle_vertical_mirroring": self.toggle_vertical_mirroring,
+            "move_horizontal_mirroring": self.move_horizontal_mirroring,
+            "move_vertical_mirroring": self.move_vertical_mirroring,
+            "add_layer": self.add_layer,
+            "delete_layer": self.delete_layer,
+            "next_layer": self.next_layer,
+            "toggle_layer": self.toggle_layer,
+            "layer_opacity_up": lambda: self.change_layer_opacity(10),
+            "layer_opacity_down": lambda: self.change_layer_opacity(-10),
+            "next_frame": self.next_frame,
+            "previous_frame": self.previous_frame,
+            "add_frame": self.add_frame,
+            "duplicate_frame": self.duplicate_frame,
+            "delete_frame": self.delete_frame,
+            "copy_selection": self.copy_selection,
+            "cut_selection": self.cut_selection,
+            "paste": self.paste,
+            "clear_selection": self.clear_selection,
+            "flip_clipboard_horizontal": self.flip_clipboard_horizontal,
+            "flip_clipboard_vertical": self.flip_clipboard_vertical,
+            "rotate_clipboard": self.rotate_clipboard,
+        }
+        for i in range(10):
+            actions["select_color_" + str(i)] = lambda i=i: self.set_color(i)
+        for i in range(self.tool_count + 1):
+            actions["select_tool_" + str(i)] = lambda i=i: self.select_tool(i)
+        return actions
+
+    def perform_action(self):
+        if not self.pen_down:
+            self.begin_action() # start a new undo step
+
+        # Tools actions
+        if self.tool_id==0: # DOT
+            self.pen_down = False
+            self.draw_pixel()                        
+        elif self.tool_id==1: # PEN
+            self.pen_down = not self.pen_down
+        elif self.tool_id==2: # BUCKET
+            self.bucket_fill(self.cursor_x, self.cursor_y, self.color_pair - 1)
+        elif self.tool_id==3: # LINE
+            self.draw_line()            
+        elif self.tool_id==4: # RECT
+            self.draw_rect()            
+        elif self.tool_id==5: # ELLIPSE
+            self.draw_ellipse()            
+        elif self.tool_id==6: # COPY
+            self.pick_pixel()    
+            self.tool_id=0
+            self.pen_down = False
+        elif self.tool_id==7: # SELECT
+            self.select_rect()
+        elif self.tool_id==8: # LASSO
+            self.select_lasso()
+        elif self.tool_id==9: # STAMP
+            self.pen_down = not self.pen_down
+            self.stamped = None
+
+    def fill_at_cursor(self):
+        self.begin_action()  # Start a new undo step
+        self.bucket_fill(self.cursor_x, self.cursor_y, self.color_pair - 1)
+
+    def select_tool(self, tool_id):
+        self.pen_down = False
+        if tool_id == 6: # COPY TOOL
+            self.pick_pixel()
+        self.tool_id = tool_id
+
+    def next_tool(self):
+        self.pen_down = False
+        if self.tool_id < self.tool_count:
+            self.tool_id += 1
+        else:
+            self.tool_id = 0
+
+    def previous_tool(self):
+        self.pen_down = False
+        if self.tool_id > 0:
+            self.tool_id -= 1
+        else:
+            self.tool_id = self.tool_count
+
+    def move_horizontal_mirroring(self):
+        if (self.mirror_x_offset < int(self.width-6)):
+            self.mirror_x_offset+=2
+        else:
+            self.mirror_x_offset=-int(self.width-4)
+
+    def move_vertical_mirroring(self):
+        if (self.mirror_y_offset < int(self.height-6)):
+            self.mirror_y_offset+=2
+        else:
+            self.mirror_y_offset=-int(self.height-4)
+
+    def toggle_horizontal_mirroring(self):
+        self.mirror_h = not self.mirror_h
+
+    def toggle_vertical_mirroring(self):
+        self.mirror_v = not self.mirror_v
+
+    def begin_action(self):
+        # everything drawn since the previous call becomes one undo step
+        self.history.commit(self.pixels)
+
+    def undo(self):
+        delta = self.history.undo(self.pixels)
+        if delta:
+            self.show_layer_of(self.history.redo_stack[-1][2])
+            self.mark_delta(delta)
+            self.request_redraw()
+
+    def redo(self):
+        delta = self.history.redo(self.pixels)
+        if delta:
+            self.show_layer_of(self.history.undo_stack[-1][2])
+            self.mark_delta(delta)
+            self.request_redraw()
+
+    def show_layer_of(self, pixels):
+        # undo/redo makes the frame and layer it changed the current ones
+        for f, frame in enumerate(self.frames):
+            for i, layer in enumerate(frame.layers):
+                if layer.pixels is pixels:
+                    if f != self.frame_index:
+                        self.select_frame(f)
+                    elif i != self.active_layer:
+                        self.journal_changes()
+                    self.active_layer = i
+                    return
+
+    # Layers: the tools draw on the active one, index 0 of an upper layer is
+    # see-through. Changing the stack is not an undo step.
+
+    def add_layer(self):
+        if self.project:
+            return  # .pix projects hold one plane
+        self.begin_action()
+        self.layers.insert(self.active_layer + 1, Layer("Layer " + str(len(self.layers)), self.new_pixels()))
+        self.active_layer += 1
+        self.layers_changed()
+
+    def delete_layer(self):
+        if len(self.layers) == 1:
+            return
+        self.begin_action()
+        layer = self.layers.pop(self.active_layer)
+        self.history.forget(layer.pixels)
+        self.active_layer = min(self.active_layer, len(self.layers) - 1)
+        self.layers_changed()
+
+    def next_layer(self):
+        self.begin_action()
+        self.journal_changes()
+        self.active_layer = (self.active_layer + 1) % len(self.layers)
+
+    def toggle_layer(self):
+        layer = self.layers[self.active_layer]
+        layer.visible = not layer.visible
+        self.layers_changed()
+
+    def change_layer_opacity(self, step):
+        layer = self.layers[self.active_layer]
+        layer.opacity = min(max(layer.opacity + step, 0), 100)
+        self.layers_changed()
+
+    # Animation frames: every frame has its own layers. A duplicated frame
+    # shares the pixels of its keyframe and stores the tiles it changes.
+
+    def select_frame(self, index):
+        self.begin_action()
+        self.journal_changes()
+        self.frames[self.frame_index].active_layer = self.active_layer
+        frame = self.frames[index]
+        self.frame_index = index
+        self.layers, self.active_layer, self.composite = frame.layers, frame.active_layer, frame.composite
+        # the frame keeps its own composite, only the view changes
+        self.request_redraw()
+
+    def next_frame(self):
+        self.select_frame((self.frame_index + 1) % len(self.frames))
+
+    def previous_frame(self):
+        self.select_frame((self.frame_index - 1) % len(self.frames))
+
+    def add_frame(self):
+        if self.project:
+            return  # .pix projects hold one plane
+        layers = [Layer("Background", self.new_pixels())]
+        self.frames.insert(self.frame_index + 1, Frame(layers, Composite(self, layers)))
+        self.select_frame(self.frame_index + 1)
+        self.layers_changed()  # the layers after it are numbered differently
+
+    def duplicate_frame(self):
+        if self.project:
+            return
+        self.begin_action()
+        layers = []
+        for layer in self.layers:
+            if not isinstance(layer.pixels, DiffPixels):
+                # the pixels become a keyframe: frozen, this frame now draws on a diff of them
+                diff = DiffPixels(layer.pixels, self.width, self.height)
+                self.history.rebind(layer.pixels, diff)
+                layer.pixels = diff
+            layers.append(Layer(layer.name, layer.pixels.copy(), layer.visible, layer.opacity))
+        frame = self.frames[self.frame_index]
+        copy = Frame(layers, Composite(self, layers), frame.duration)
+        copy.active_layer = self.active_layer
+        self.frames.insert(self.frame_index + 1, copy)
+        self.select_frame(self.frame_index + 1)
+        self.layers_changed()
+
+    def delete_frame(self):
+        if len(self.frames) == 1:
+            return
+        self.begin_action()
+        frame = self.frames.pop(self.frame_index)
+        for layer in frame.layers:
+            self.history.forget(layer.pixels)
+        index = min(self.frame_index, len(self.frames) - 1)
+        self.frame_index = index  # the deleted frame isn't stored back
+        frame = self.frames[index]
+        self.layers, self.active_layer, self.composite = frame.layers, frame.active_layer, frame.composite
+        self.layers_changed()
+
+    def journal_changes(self):
+        # the autosave journals the active layer, what changed on it goes
+        # out before another layer becomes the active one
+        if self.autosave and self.changed_rects:
+            self.autosave.write_rects(self, self.changed_rects)
+
+    def layers_changed(self):
+        # the composite is rebuilt on the next view_pixels()
+        self.request_redraw()
+        if self.autosave:
+            self.autosave.snapshot(self)
+
+    def mark_delta(self, delta):
+        # the rows an undo/redo step rewrote count as changed (autosave, overview)
+        for start, before, _ in delta:
+            self.mark_dirty(0, start // self.width, self.width - 1, (start + len(before) - 1) // self.width)
+
+    def open_project(self, path, keymap=None):
+        """Edit a .pix project, it is created from the current canvas if the file is missing."""
+        if os.path.exists(path):
+            project = Project.open(path)
+            if keymap:
+                project.keymap = keymap
+        else:
+            project = Project.create(path, self, keymap or "default.key")
+        self.width, self.height = project.width, project.height
+        self.colors = list(project.colors)
+        self.tiled = False
+        self.reset_layers(project.pixels)
+        self.mirror_h = bool(project.flags & Project.MIRROR_H)
+        self.mirror_v = bool(project.flags & Project.MIRROR_V)
+        self.mirror_x_offset, self.mirror_y_offset = project.mirror_x_offset, project.mirror_y_offset
+        self.history.load(*project.load_history(), project.pixels)
+        self.project = project
+        self.cursor_x = self.width // 2
+        self.cursor_y = self.height // 2
+        self.initialize_colors()
+        self.set_color(1)
+        self.request_redraw()
+        return project
+
+    def save_project(self):
+        # the pixels are already in the file, this writes the rest and syncs it
+        self.project.save(self)
+
+    def close_project(self):
+        self.project.close(self)
+        self.project = None
+
+    def restore(self, width, height, colors, frames, frame_index=0):
+        # load a canvas recovered from the autosave, the frames as Autosave.recover() gives them
+        self.width, self.height = width, height
+        self.colors = list(colors)
+        self.tiled = any(isinstance(layer[3], TiledPixels) for _, _, layers in frames for layer in layers)
+        self.frames = []
+        for duration, active_layer, layers in frames:
+            layers = [Layer(name, pixels, visible, opacity) for name, visible, opacity, pixels in layers]
+            frame = Frame(layers, Composite(self, layers), duration)
+            frame.active_layer = min(active_layer, len(layers) - 1)
+            self.frames.append(frame)
+        self.frame_index = frame_index
+        frame = self.frames[frame_index]
+        self.layers, self.active_layer, self.composite = frame.layers, frame.active_layer, frame.composite
+        self.selection = None
+        self.cursor_x = self.width // 2
+        self.cursor_y = self.height // 2
+        self.history.clear()
+        self.initialize_colors()
+        self.set_color(1)
+        self.request_redraw()
@@ -0,0 +1,125 @@
+# Undo/redo history of the canvas
+
+import bisect
+
+DEFAULT_UNDO_BUDGET=16*1024*1024 # Undo history memory budget in bytes
+
+class History:
+    """Undo/redo of the canvas, stored as sparse deltas of the pixel buffer.
+
+    Pixel writes call record() with the range about to change, commit()
+    turns everything recorded since the last commit into one undo step made
+    of merged (start, before, after) byte ranges. A step is (delta, size,
+    pixels), it remembers the buffer (layer) it changed. The oldest steps
+    are dropped when the deltas use more than `budget` bytes.
+    """
+
+    # bytes accounted for each stored range on top of its data
+    RANGE_OVERHEAD = 64
+    # ranges closer than this are merged into one
+    MERGE_GAP = 8
+
+    def __init__(self, budget=DEFAULT_UNDO_BUDGET):
+        self.budget = budget
+        self.undo_stack = []
+        self.redo_stack = []
+        self.records = []
+        self.size = 0
+
+    def record(self, pixels, start, end):
+        self.records.append((start, bytes(pixels[start:end])))
+
+    def commit(self, pixels):
+        if not self.records:
+            return
+        records = self.records
+        self.records = []
+
+        # Merge the recorded ranges
+        merged = []
+        for start, end in sorted((start, start + len(old)) for start, old in records):
+            if merged and start <= merged[-1][1] + self.MERGE_GAP:
+                merged[-1][1] = max(merged[-1][1], end)
+            else:
+                merged.append([start, end])
+
+        # Rebuild the "before" bytes: the oldest record of a pixel wins, so apply them newest first
+        starts = [start for start, _ in merged]
+        befores = [bytearray(pixels[start:end]) for start, end in merged]
+        for start, old in reversed(records):
+            i = bisect.bisect_right(starts, start) - 1
+            offset = start - starts[i]
+            befores[i][offset:offset + len(old)] = old
+
+        delta = []
+        size = 0
+        for (start, end), before in zip(merged, befores):
+            after = bytes(pixels[start:end])
+            if before != after:
+                delta.append((start, bytes(before), after))
+                size += 2 * (end - start) + self.RANGE_OVERHEAD
+        if not delta:
+            return
+
+        self.undo_stack.append((delta, size, pixels))
+        self.size += size
+        for _, redo_size, _ in self.redo_stack:
+            self.size -= redo_size
+        self.redo_stack = []
+
+        # Keep the history within the memory budget (always keep the last step)
+        while self.size > self.budget and len(self.undo_stack) > 1:
+            _, old_size, _ = self.undo_stack.pop(0)
+            self.size -= old_size
+
+    def undo(self, pixels):
+        # pixels is the buffer being drawn on, the step is undone on its own buffer
+        self.commit(pixels)
+        if not self.undo_stack:
+            return False
+        step = self.undo_stack.pop()
+        delta, _, target = step
+        for start, before, _ in delta:
+            target[start:start + len(before)] = before
+        self.redo_stack.append(step)
+        return delta
+
+    def redo(self, pixels):
+        self.commit(pixels)
+        if not self.redo_stack:
+            return False
+        step = self.redo_stack.pop()
+        delta, _, target = step
+        for start, _, after in delta:
+            target[start:start + len(after)] = after
+        self.undo_stack.append(step)
+        return delta
+
+    def forget(self, pixels):
+        # drop the steps of a buffer that is gone (deleted layer)
+        self.undo_stack = [step for step in self.undo_stack if step[2] is not pixels]
+        self.redo_stack = [step for step in self.redo_stack if step[2] is not pixels]
+        self.size = sum(size for _, size, _ in self.undo_stack + self.redo_stack)
+
+    def rebind(self, pixels, new_pixels):
+        # the steps of a buffer that was replaced apply to the new one
+        self.undo_stack = [(delta, size, new_pixels if target is pixels else target)
+                           for delta, size, target in self.undo_stack]
+        self.redo_stack = [(delta, size, new_pixels if target is pixels else target)
+                           for delta, size, target in self.redo_stack]
+
+    def load(self, undo_deltas, redo_deltas, pixels):
+        # steps saved with a project, oldest first
+        self.clear()
+        self.undo_stack = [(delta, self.delta_size(delta), pixels) for delta in undo_deltas]
+        self.redo_stack = [(delta, self.delta_size(delta), pixels) for delta in redo_deltas]
+        self.size = sum(size for _, size, _ in self.undo_stack + self.redo_stack)
+
+    def delta_size(self, delta):
+        return sum(2 * len(before) + self.RANGE_OVERHEAD for _, before, _ in delta)
+
+    def clear(self):
+        self.undo_stack = []
+        self.redo_stack = []
+        self.records = []
+        self.size = 0
@@ -0,0 +1,100 @@
+# Layer stack of the canvas and its cached composite
+
+import re
+
+NON_BLANK = re.compile(rb'[^\x00]+')  # runs of drawn pixels in a row of indexes
+
+
+class Layer:
+    """Palette indexes of one layer, index 0 (blank) lets the layers below show.
+
+    opacity is in percent, layers under 100 are blended with what is below
+    and matched back to the nearest palette color.
+    """
+
+    def __init__(self, name, pixels, visible=True, opacity=100):
+        self.name = name
+        self.pixels = pixels
+        self.visible = visible
+        self.opacity = opacity
+
+
+class Composite:
+    """The visible layers flattened into one buffer of palette indexes.
+
+    The canvas calls invalidate() for every changed rectangle and update()
+    recomposites only those, one row slice per layer with the blank runs
+    skipped, so the renderer reads a ready buffer. A different layer
+    stack, visibility, opacity, size or palette recomposites everything
+    into a new buffer (so the overview pyramid sees a new one too).
+    """
+
+    def __init__(self, canvas, layers):
+        # layers is the list of one frame, changed in place by the canvas
+        self.canvas = canvas
+        self.layers = layers
+        self.key = None
+        self.pixels = None
+        self.dirty = []
+        self.blends = {}  # (below, above, opacity) -> palette index
+
+    def state(self):
+        canvas = self.canvas
+        return (canvas.width, canvas.height,
+                tuple((id(layer.pixels), layer.visible, layer.opacity) for layer in self.layers))
+
+    def reset(self):
+        # palette changed, or the composite isn't used for now
+        self.key = None
+        self.dirty = []
+        self.blends = {}
+
+    def invalidate(self, x0, y0, x1, y1):
+        if self.key is not None:
+            self.dirty.append((x0, y0, x1, y1))
+
+    def update(self):
+        """The composite buffer, brought up to date."""
+        canvas = self.canvas
+        state = self.state()
+        if state != self.key:
+            self.key = state
+            self.pixels = canvas.new_pixels()
+            self.dirty = [(0, 0, canvas.width - 1, canvas.height - 1)]
+        dirty = self.dirty
+        self.dirty = []
+        for rect in dirty:
+            self.compose(*rect)
+        return self.pixels
+
+    def blend(self, below, above, opacity):
+        key = (below, above, opacity)
+        index = self.blends.get(key)
+        if index is None:
+            colors = self.canvas.colors
+            color = tuple(round(b + (a - b) * opacity / 100) for b, a in zip(colors[below], colors[above]))
+            index = self.blends[key] = self.canvas.matcher.match(color)
+        return index
+
+    def compose(self, x0, y0, x1, y1):
+        canvas = self.canvas
+        width = canvas.width
+        x0, x1 = max(x0, 0), min(x1, width - 1)
+        y0, y1 = max(y0, 0), min(y1, canvas.height - 1)
+        if x0 > x1:
+            return
+        layers = [layer for layer in self.layers if layer.visible and layer.opacity > 0]
+        for y in range(y0, y1 + 1):
+            start = y * width + x0
+            end = y * width + x1 + 1
+            row = bytearray(end - start)
+            for layer in layers:
+                data = layer.pixels[start:end]
+                if layer.opacity >= 100:
+                    for run in NON_BLANK.finditer(data):
+                        row[run.start():run.end()] = run.group()
+                else:
+                    for run in NON_BLANK.finditer(data):
+                        for i in range(run.start(), run.end()):
+                            row[i] = self.blend(row[i], data[i], layer.opacity)
+            self.pixels[start:end] = row
@@ -0,0 +1,112 @@
+# Palette colors: nearest color matching and the quantizers used to import images
+
+_numpy = None
+
+def optional_numpy():
+    """NumPy when it is installed, else None.
+
+    It is optional and slow to import, so it is only loaded the first time a
+    whole image is matched.
+    """
+    global _numpy
+    if _numpy is None:
+        try:
+            import numpy
+        except ImportError:
+            numpy = False
+        _numpy = numpy
+    return _numpy or None
+
+# Color quantizers for images with too many colors
+QUANTIZERS = ("median-cut", "octree", "libimagequant")
+
+def quantize_method(name):
+    """Pillow quantize method of a QUANTIZERS name."""
+    from PIL import Image
+    return {
+        "median-cut": Image.Quantize.MEDIANCUT,
+        "octree": Image.Quantize.FASTOCTREE,
+        "libimagequant": Image.Quantize.LIBIMAGEQUANT,
+    }[name]
+
+def rgb_to_lab(color):
+    """Convert an sRGB tuple to CIELAB (D65)."""
+    def linear(c):
+        c = c / 255
+        return c / 12.92 if c <= 0.04045 else ((c + 0.055) / 1.055) ** 2.4
+    r, g, b = (linear(c) for c in color)
+    x = (r * 0.4124 + g * 0.3576 + b * 0.1805) / 0.95047
+    y = (r * 0.2126 + g * 0.7152 + b * 0.0722)
+    z = (r * 0.0193 + g * 0.1192 + b * 0.9505) / 1.08883
+
+    def f(t):
+        return t ** (1 / 3) if t > 0.008856 else 7.787 * t + 16 / 116
+    fx, fy, fz = f(x), f(y), f(z)
+    return (116 * fy - 16, 500 * (fx - fy), 200 * (fy - fz))
+
+class ColorMatcher:
+    """Nearest palette color lookup.
+
+    Results are cached per RGB value, the cache is rebuilt by set_palette
+    whenever the palette changes. The metric is either "rgb" (euclidean
+    RGB distance) or "lab" (CIELAB delta E, closer to what the eye sees).
+    match_image maps a whole RGB image at once, with NumPy when it is
+    installed.
+    """
+
+    METRICS = ("rgb", "lab")
+
+    def __init__(self, colors, metric="rgb"):
+        if metric not in self.METRICS:
+            raise ValueError(f"Unknown color metric: {metric}")
+        self.metric = metric
+        self.set_palette(colors)
+
+    def set_palette(self, colors):
+        self.colors = list(colors[:256])
+        self.points = [rgb_to_lab(c) for c in self.colors] if self.metric == "lab" else self.colors
+        # exact colors are their own match, the first one wins on duplicates
+        self.cache = {}
+        for i, color in enumerate(self.colors):
+            self.cache.setdefault(color, i)
+
+    def match(self, color):
+        index = self.cache.get(color)
+        if index is None:
+            point = rgb_to_lab(color) if self.metric == "lab" else color
+            a, b, c = point
+            distances = [(a - p) ** 2 + (b - q) ** 2 + (c - r) ** 2 for p, q, r in self.points]
+            index = distances.index(min(distances))
+            self.cache[color] = index
+        return index
+
+    def match_many(self, colors):
+        """Palette indexes for a list of RGB colors."""
+        missing = [color for color in set(colors) if color not in self.cache]
+        numpy = optional_numpy()
+        if numpy is not None and len(missing) > 64:
+            points = [rgb_to_lab(c) for c in missing] if self.metric == "lab" else missing
+            points = numpy.array(points, dtype=numpy.float32)
+            palette = numpy.array(self.points, dtype=numpy.float32)
+            # in chunks to keep the distance matrix small
+            for start in range(0, len(missing), 4096):
+                chunk = points[start:start + 4096]
+                distances = ((chunk[:, None, :] - palette[None, :, :]) ** 2).sum(axis=2)
+                for color, index in zip(missing[start:start + 4096], distances.argmin(axis=1)):
+                    self.cache[color] = int(index)
+        return [self.match(color) for color in colors]
+
+    def match_image(self, image):
+        """Palette index buffer (bytearray, row major) for an RGB PIL image."""
+        numpy = optional_numpy()
+        if numpy is not None:
+            rgb = numpy.asarray(image, dtype=numpy.uint32)
+            keys = (rgb[:, :, 0] << 16) | (rgb[:, :, 1] << 8) | rgb[:, :, 2]
+            unique, inverse = numpy.unique(keys.ravel(), return_inverse=True)
+            colors = [(int(k) >> 16, (int(k) >> 8) & 255, int(k) & 255) for k in unique]
+            lookup = numpy.array(self.match_many(colors), dtype=numpy.uint8)
+            return bytearray(lookup[inverse].tobytes())
+        pixels = list(image.getdata())
+        unique = list(set(pixels))
+        lookup = dict(zip(unique, self.match_many(unique)))
+        return bytearray(lookup[color] for color in pixels)
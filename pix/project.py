@@ -0,0 +1,203 @@
+# Native .pix project files, the canvas is memory-mapped from the file
+
+import mmap
+import os
+import struct
+
+PROJECT_VERSION = 1
+
+
+class Project:
+    """A .pix project: the canvas state in one file, pixels edited in place.
+
+    Layout: b'PIXP' and HEADER (version, flags, width, height, color
+    count, mirror offsets, offset of the index plane), the keymap name
+    (KEYMAP_SIZE bytes, utf-8, zero padded), a 256 color palette as RGB
+    bytes, then the index plane (one palette index per pixel, row major)
+    at a multiple of mmap.ALLOCATIONGRANULARITY, and the undo journal
+    after it: undo and redo step counts (uint32), every step as its range
+    count and each range as start, length (uint32), before and after bytes.
+
+    The index plane is mapped with mmap and used as the canvas pixels, so
+    opening costs the same for any size, drawing writes straight to the
+    file and nothing is decoded or quantized. The header, palette and
+    journal are written by save(). The OPEN flag stays set while the file
+    is in use, a journal found with it set (pix did not close the file)
+    may not match the pixels and is dropped.
+    """
+
+    MAGIC = b'PIXP'
+    HEADER = struct.Struct('<HHIIIiiQ')
+    KEYMAP_SIZE = 256
+    PALETTE_SIZE = 256 * 3
+    COUNT = struct.Struct('<II')
+    RANGE = struct.Struct('<II')
+
+    # flags
+    MIRROR_H = 1
+    MIRROR_V = 2
+    OPEN = 4
+
+    def __init__(self, path, file, header):
+        self.path = path
+        self.file = file
+        (version, self.flags, self.width, self.height, count,
+         self.mirror_x_offset, self.mirror_y_offset, self.plane_offset) = header
+        if version != PROJECT_VERSION:
+            raise ValueError(f"'{path}' is a version {version} project, this pix reads version {PROJECT_VERSION}.")
+        file.seek(len(self.MAGIC) + self.HEADER.size)
+        self.keymap = file.read(self.KEYMAP_SIZE).rstrip(b'\0').decode('utf-8', 'replace')
+        palette = file.read(self.PALETTE_SIZE)
+        self.colors = [tuple(palette[i:i + 3]) for i in range(0, count * 3, 3)]
+        self.history_offset = self.plane_offset + self.width * self.height
+        self.crashed = bool(self.flags & self.OPEN)
+
+        # the plane offset has to suit mmap here, a file written on a system with
+        # a larger granularity is read into memory and written back by save()
+        self.mapped = self.plane_offset % mmap.ALLOCATIONGRANULARITY == 0
+        if self.mapped:
+            self.pixels = mmap.mmap(file.fileno(), self.width * self.height, offset=self.plane_offset)
+        else:
+            file.seek(self.plane_offset)
+            self.pixels = bytearray(file.read(self.width * self.height))
+
+    @classmethod
+    def read_header(cls, file, path):
+        data = file.read(len(cls.MAGIC) + cls.HEADER.size)
+        if data[:len(cls.MAGIC)] != cls.MAGIC or len(data) < len(cls.MAGIC) + cls.HEADER.size:
+            raise ValueError(f"'{path}' is not a pix project.")
+        header = cls.HEADER.unpack_from(data, len(cls.MAGIC))
+        width, height, plane_offset = header[2], header[3], header[7]
+        if width < 1 or height < 1 or os.fstat(file.fileno()).st_size < plane_offset + width * height:
+            raise ValueError(f"'{path}' is a damaged pix project.")
+        return header
+
+    @classmethod
+    def open(cls, path):
+        file = open(path, 'r+b')
+        try:
+            project = cls(path, file, cls.read_header(file, path))
+        except Exception:
+            file.close()
+            raise
+        project.flags |= cls.OPEN
+        project.write_header()
+        file.flush()
+        return project
+
+    @classmethod
+    def stored_keymap(cls, path):
+        """Keymap name saved in a project, raises ValueError if it isn't one."""
+        with open(path, 'rb') as file:
+            cls.read_header(file, path)
+            return file.read(cls.KEYMAP_SIZE).rstrip(b'\0').decode('utf-8', 'replace')
+
+    @classmethod
+    def create(cls, path, canvas, keymap="default.key"):
+        """Write the canvas to a new project file and open it."""
+        header_size = len(cls.MAGIC) + cls.HEADER.size + cls.KEYMAP_SIZE + cls.PALETTE_SIZE
+        granularity = mmap.ALLOCATIONGRANULARITY
+        plane_offset = -(-header_size // granularity) * granularity
+        flags = (cls.MIRROR_H if canvas.mirror_h else 0) | (cls.MIRROR_V if canvas.mirror_v else 0)
+        colors = canvas.colors[:256]
+        with open(path, 'wb') as file:
+            file.write(cls.MAGIC)
+            file.write(cls.HEADER.pack(PROJECT_VERSION, flags, canvas.width, canvas.height, len(colors),
+                                       canvas.mirror_x_offset, canvas.mirror_y_offset, plane_offset))
+            file.write(cls.keymap_bytes(keymap))
+            file.write(cls.palette_bytes(colors))
+            # the blank plane is a hole in the file, only what is drawn is written
+            file.truncate(plane_offset + canvas.width * canvas.height)
+            for start, end in canvas.stored_ranges():
+                data = bytes(canvas.pixels[start:end])
+                if data.count(0) != len(data):
+                    file.seek(plane_offset + start)
+                    file.write(data)
+            file.seek(plane_offset + canvas.width * canvas.height)
+            file.write(cls.COUNT.pack(0, 0))
+        return cls.open(path)
+
+    @classmethod
+    def keymap_bytes(cls, keymap):
+        data = (keymap or "").encode('utf-8')[:cls.KEYMAP_SIZE]
+        return data + bytes(cls.KEYMAP_SIZE - len(data))
+
+    @classmethod
+    def palette_bytes(cls, colors):
+        data = bytes(channel for color in colors[:256] for channel in color)
+        return data + bytes(cls.PALETTE_SIZE - len(data))
+
+    def write_header(self):
+        self.file.seek(0)
+        self.file.write(self.MAGIC)
+        self.file.write(self.HEADER.pack(PROJECT_VERSION, self.flags, self.width, self.height, len(self.colors),
+                                         self.mirror_x_offset, self.mirror_y_offset, self.plane_offset))
+        self.file.write(self.keymap_bytes(self.keymap))
+
+    def write_palette(self, colors):
+        # the palette lives outside of the mapped plane, written whenever it changes
+        self.colors = list(colors[:256])
+        self.write_header()
+        self.file.write(self.palette_bytes(self.colors))
+        self.file.flush()
+
+    def load_history(self):
+        """(undo deltas, redo deltas) of the saved journal, empty after a crash."""
+        if self.crashed:
+            return [], []
+        self.file.seek(self.history_offset)
+        data = self.file.read()
+        stacks = ([], [])
+        try:
+            counts = self.COUNT.unpack_from(data, 0)
+            position = self.COUNT.size
+            for stack, count in zip(stacks, counts):
+                for _ in range(count):
+                    ranges, = struct.unpack_from('<I', data, position)
+                    position += 4
+                    delta = []
+                    for _ in range(ranges):
+                        start, length = self.RANGE.unpack_from(data, position)
+                        position += self.RANGE.size
+                        if position + 2 * length > len(data):
+                            raise ValueError("journal cut short")
+                        delta.append((start, data[position:position + length],
+                                      data[position + length:position + 2 * length]))
+                        position += 2 * length
+                    stack.append(delta)
+        except (struct.error, ValueError):
+            return [], []
+        return stacks
+
+    def write_history(self, history):
+        self.file.seek(self.history_offset)
+        self.file.truncate()
+        self.file.write(self.COUNT.pack(len(history.undo_stack), len(history.redo_stack)))
+        for delta, _, _ in history.undo_stack + history.redo_stack:
+            self.file.write(struct.pack('<I', len(delta)))
+            for start, before, after in delta:
+                self.file.write(self.RANGE.pack(start, len(before)))
+                self.file.write(before)
+                self.file.write(after)
+
+    def save(self, canvas):
+        """Write everything that isn't mapped (mirrors, palette, keymap, undo) and sync the file."""
+        canvas.begin_action()
+        self.flags = (self.flags & self.OPEN) | (self.MIRROR_H if canvas.mirror_h else 0) | \
+                     (self.MIRROR_V if canvas.mirror_v else 0)
+        self.mirror_x_offset, self.mirror_y_offset = canvas.mirror_x_offset, canvas.mirror_y_offset
+        if self.mapped:
+            self.pixels.flush()
+        else:
+            self.file.seek(self.plane_offset)
+            self.file.write(self.pixels)
+        self.write_history(canvas.history)
+        self.write_palette(canvas.colors)
+        os.fsync(self.file.fileno())
+
+    def close(self, canvas):
+        self.flags &= ~self.OPEN
+        self.save(canvas)
+        if self.mapped:
+            self.pixels.close()
+        self.file.close()
@@ -0,0 +1,96 @@
+# Downsampled copies of the canvas for the overview
+
+TILE = 32 # Pixels per side of the tiles that are updated on their own
+
+
+def mode4(a, b, c, d):
+    # most common of four palette indexes, the first one wins a tie
+    if a == b or a == c or a == d:
+        return a
+    if b == c or b == d:
+        return b
+    if c == d:
+        return c
+    return a
+
+
+class Pyramid:
+    """Mipmap pyramid of the canvas palette indexes.
+
+    Level k is the canvas shrunk 2**k times, each pixel is the most common
+    index (mode filter) of the 2x2 block below it, so pixel art keeps its
+    exact colors. Level 0 is the canvas itself, its layers flattened.
+    invalidate() only marks tiles, they are recomputed when level() is
+    asked for, so keeping the pyramid up to date while drawing costs next
+    to nothing. A new pixel buffer or canvas size rebuilds everything.
+    """
+
+    def __init__(self, canvas):
+        self.canvas = canvas
+        self.key = None
+        self.sizes = []
+        self.levels = []
+        self.dirty = []
+
+    def reset(self):
+        canvas = self.canvas
+        pixels = canvas.view_pixels()
+        self.key = (id(pixels), canvas.width, canvas.height)
+        width, height = canvas.width, canvas.height
+        self.sizes = [(width, height)]
+        while width > 1 or height > 1:
+            width, height = (width + 1) // 2, (height + 1) // 2
+            self.sizes.append((width, height))
+        self.levels = [pixels] + [bytearray(w * h) for w, h in self.sizes[1:]]
+        # every tile of every level starts dirty
+        self.dirty = [set()] + [{(tx, ty) for ty in range(-(-h // TILE)) for tx in range(-(-w // TILE))}
+                                for w, h in self.sizes[1:]]
+
+    def check(self):
+        canvas = self.canvas
+        if self.key != (id(canvas.view_pixels()), canvas.width, canvas.height):
+            self.reset()
+
+    def invalidate(self, x0, y0, x1, y1):
+        # canvas rectangle (inclusive) whose pixels changed
+        canvas = self.canvas
+        if self.key is None or self.key[1:] != (canvas.width, canvas.height):
+            return  # not built yet or rebuilt anyway by the next level()
+        for k in range(1, len(self.sizes)):
+            for ty in range((y0 >> k) // TILE, (y1 >> k) // TILE + 1):
+                for tx in range((x0 >> k) // TILE, (x1 >> k) // TILE + 1):
+                    self.dirty[k].add((tx, ty))
+
+    def level(self, k):
+        """(width, height, pixels) of level k, brought up to date."""
+        self.check()
+        k = min(k, len(self.sizes) - 1)
+        for level in range(1, k + 1):
+            for tile in self.dirty[level]:
+                self.update_tile(level, *tile)
+            self.dirty[level].clear()
+        width, height = self.sizes[k]
+        return width, height, self.levels[k]
+
+    def update_tile(self, k, tx, ty):
+        width, height = self.sizes[k]
+        src_w, src_h = self.sizes[k - 1]
+        src = self.levels[k - 1]
+        dst = self.levels[k]
+        x0, x1 = tx * TILE, min((tx + 1) * TILE, width)
+        for y in range(ty * TILE, min((ty + 1) * TILE, height)):
+            top = 2 * y * src_w
+            bottom = min(2 * y + 1, src_h - 1) * src_w
+            row = y * width
+            for x in range(x0, x1):
+                left = 2 * x
+                right = min(left + 1, src_w - 1)
+                dst[row + x] = mode4(src[top + left], src[top + right], src[bottom + left], src[bottom + right])
+
+    def fit(self, columns, rows):
+        # smallest level whose half-block rendering fits columns x rows cells
+        self.check()
+        for k, (width, height) in enumerate(self.sizes):
+            if width <= columns and (height + 1) // 2 <= rows:
+                return k
+        return len(self.sizes) - 1
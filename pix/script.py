@@ -0,0 +1,251 @@
+# Headless batch mode: replay a command file on many images
+#
+#   python -m pix --script ops.txt in/*.png -o out/
+#
+# One command per line, coordinates are image pixels from the top left:
+#
+#   color <0-9 | #rrggbb>        drawing color, like the number keys or a hex color
+#   dot <x> <y>
+#   line <x1> <y1> <x2> <y2>
+#   rect <x1> <y1> <x2> <y2>
+#   ellipse <x1> <y1> <x2> <y2> [filled]
+#   fill <x> <y>                 bucket fill (uses -T and --diagonal-fill)
+#   mirror <h | v | hv | off>
+#   swap <#rrggbb> <#rrggbb>     every pixel of the first color gets the second, the palette
+#                                keeps both so later color numbers don't change
+#   copy <x1> <y1> <x2> <y2>     copy a rectangle to the clipboard
+#   cut <x1> <y1> <x2> <y2>      copy it and blank it
+#   paste <x> <y>                clipboard with its top left corner at x, y
+#   flip <h | v>                 flip the clipboard
+#   rotate                       turn the clipboard 90° clockwise
+#
+# Lines starting with # are comments.
+
+import glob
+import os
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+from .canvas import Canvas
+
+# command -> argument types, "int", "color" (0-9 or hex), "hex", "mirror" or "axis"
+COMMANDS = {
+    "color": ["color"],
+    "dot": ["int", "int"],
+    "line": ["int", "int", "int", "int"],
+    "rect": ["int", "int", "int", "int"],
+    "ellipse": ["int", "int", "int", "int"],
+    "fill": ["int", "int"],
+    "mirror": ["mirror"],
+    "swap": ["hex", "hex"],
+    "copy": ["int", "int", "int", "int"],
+    "cut": ["int", "int", "int", "int"],
+    "paste": ["int", "int"],
+    "flip": ["axis"],
+    "rotate": [],
+}
+
+MIRRORS = {"h": (True, False), "v": (False, True), "hv": (True, True), "off": (False, False)}
+
+
+def parse_hex(text):
+    if not (text.startswith('#') and len(text) == 7):
+        raise ValueError(f"expected a #rrggbb color, got '{text}'")
+    return tuple(int(text[i:i + 2], 16) for i in (1, 3, 5))
+
+
+def parse_argument(kind, text):
+    if kind == "int":
+        return int(text)
+    if kind == "hex":
+        return parse_hex(text)
+    if kind == "color":
+        if text.isdigit() and int(text) < 10:
+            return int(text)
+        return parse_hex(text)
+    if kind == "mirror":
+        if text not in MIRRORS:
+            raise ValueError(f"expected one of {', '.join(MIRRORS)}, got '{text}'")
+        return text
+    if kind == "axis":
+        if text not in ("h", "v"):
+            raise ValueError(f"expected h or v, got '{text}'")
+        return text
+
+
+def parse_script(lines):
+    """Parse command lines into (line number, command, arguments) tuples.
+
+    Errors raise ValueError naming the line, so a bad script fails before
+    any image is touched.
+    """
+    commands = []
+    for number, line in enumerate(lines, 1):
+        words = line.split()
+        if not words or words[0].startswith('#'):
+            continue
+        name, arguments = words[0].lower(), words[1:]
+        if name not in COMMANDS:
+            raise ValueError(f"line {number}: unknown command '{name}'")
+        kinds = COMMANDS[name]
+        if name == "ellipse" and arguments[4:] == ["filled"]:
+            arguments = arguments[:4]
+            name = "ellipse_filled"
+        if len(arguments) != len(kinds):
+            raise ValueError(f"line {number}: {words[0]} takes {len(kinds)} arguments")
+        try:
+            values = [parse_argument(kind, text) for kind, text in zip(kinds, arguments)]
+        except ValueError as e:
+            raise ValueError(f"line {number}: {e}")
+        commands.append((number, name, values))
+    return commands
+
+
+def load_script(filename):
+    with open(filename, 'r') as file:
+        return parse_script(file)
+
+
+def check_point(canvas, number, x, y):
+    if not (0 <= x < canvas.width and 0 <= y < canvas.height):
+        raise ValueError(f"line {number}: ({x}, {y}) is outside the {canvas.width}x{canvas.height} image")
+
+
+def draw_shape(canvas, draw, x1, y1, x2, y2):
+    # same two steps as the editor: first corner, then the other one
+    canvas.reset_rect()
+    canvas.cursor_x, canvas.cursor_y = x1, y1
+    draw()
+    canvas.cursor_x, canvas.cursor_y = x2, y2
+    draw()
+
+
+def swap_color(canvas, old, new):
+    # remap the pixels, not the palette entry the color numbers refer to
+    swapped = [index for index, color in enumerate(canvas.colors[:256]) if color == old]
+    if not swapped:
+        return
+    table = bytearray(range(256))
+    new_index = canvas.add_color(new)
+    for index in swapped:
+        table[index] = new_index
+    pixels = canvas.pixels
+    # blank tiles that aren't stored change too when the blank color is swapped
+    ranges = [(0, len(pixels))] if 0 in swapped else canvas.stored_ranges()
+    for start, end in ranges:
+        canvas.history.record(pixels, start, end)
+        pixels[start:end] = bytes(pixels[start:end]).translate(table)
+    canvas.request_redraw()
+
+
+def apply_script(canvas, commands):
+    """Run parsed commands on a Canvas."""
+    shapes = {
+        "line": canvas.draw_line,
+        "rect": canvas.draw_rect,
+        "ellipse": canvas.draw_ellipse,
+        "ellipse_filled": lambda: canvas.draw_ellipse(filled=True),
+    }
+    for number, name, values in commands:
+        if name == "color":
+            color = values[0]
+            if isinstance(color, int):
+                canvas.set_color(color)
+            else:
+                canvas.set_color(canvas.add_color(color))
+        elif name == "dot":
+            check_point(canvas, number, *values)
+            canvas.cursor_x, canvas.cursor_y = values
+            canvas.draw_pixel()
+        elif name in shapes:
+            check_point(canvas, number, *values[:2])
+            check_point(canvas, number, *values[2:])
+            draw_shape(canvas, shapes[name], *values)
+        elif name == "fill":
+            check_point(canvas, number, *values)
+            canvas.bucket_fill(values[0], values[1], canvas.color_pair - 1)
+        elif name == "mirror":
+            canvas.mirror_h, canvas.mirror_v = MIRRORS[values[0]]
+        elif name == "swap":
+            swap_color(canvas, *values)
+        elif name in ("copy", "cut"):
+            check_point(canvas, number, *values[:2])
+            check_point(canvas, number, *values[2:])
+            canvas.selection = canvas.merge_spans(canvas.rect_spans(*values))
+            if name == "copy":
+                canvas.copy_selection()
+            else:
+                canvas.cut_selection()
+        elif name == "paste":
+            if not canvas.clipboard:
+                raise ValueError(f"line {number}: nothing was copied")
+            canvas.paste_at(*values)
+        elif name == "flip":
+            if values[0] == "h":
+                canvas.flip_clipboard_horizontal()
+            else:
+                canvas.flip_clipboard_vertical()
+        elif name == "rotate":
+            canvas.rotate_clipboard()
+        canvas.begin_action()  # keeps the recorded history from piling up
+
+
+def run_file(commands, filename, output, options):
+    # one image, runs in a worker process
+    canvas = Canvas(filename=filename, **options)
+    apply_script(canvas, commands)
+    canvas.export_image(output)
+    return output
+
+
+def expand_inputs(patterns):
+    # the shell usually expands the globs already, quoted ones are expanded here
+    files = []
+    for pattern in patterns:
+        files += sorted(glob.glob(pattern)) or [pattern]
+    return files
+
+
+def output_paths(inputs, output_dir):
+    # inputs keep their path below the directory they all share, so two
+    # images with the same name in different folders don't overwrite each other
+    inputs = [os.path.abspath(filename) for filename in inputs]
+    if not inputs:
+        return []
+    common = os.path.commonpath([os.path.dirname(filename) for filename in inputs])
+    return [os.path.join(output_dir, os.path.relpath(filename, common)) for filename in inputs]
+
+
+def run_batch(script, inputs, output_dir, jobs=None, **options):
+    """Apply the script file to every input image, saving them in output_dir.
+
+    The images are spread over `jobs` processes (default: one per core).
+    options are passed to Canvas. Returns the number of images that failed.
+    """
+    commands = load_script(script)
+    inputs = expand_inputs(inputs)
+    outputs = output_paths(inputs, output_dir)
+    for directory in sorted(set(map(os.path.dirname, outputs))) or [output_dir]:
+        os.makedirs(directory, exist_ok=True)
+    # no undo needed, history is committed and dropped after each command
+    options.setdefault("undo_budget", 0)
+    tasks = [(commands, filename, output, options) for filename, output in zip(inputs, outputs)]
+
+    failed = 0
+    if jobs == 1 or len(tasks) <= 1:
+        for task in tasks:
+            try:
+                print(run_file(*task))
+            except Exception as e:
+                print(f"Error: {task[1]}: {e}")
+                failed += 1
+        return failed
+
+    with ProcessPoolExecutor(jobs) as pool:
+        futures = {pool.submit(run_file, *task): task[1] for task in tasks}
+        for future in as_completed(futures):
+            try:
+                print(future.result())
+            except Exception as e:
+                print(f"Error: {futures[future]}: {e}")
+                failed += 1
+    return failed
@@ -0,0 +1,73 @@
+# Clipboard of the selection tools: a block of palette indexes and its shape
+
+import re
+
+SELECTED = re.compile(rb'[^\x00]+')  # runs of selected pixels in a row of the mask
+
+
+class Clip:
+    """A copied block of pixels, width x height palette indexes, row major.
+
+    mask is None for a rectangle, for a lasso it holds one byte per pixel,
+    non zero where the pixel belongs to the clip. Pasting writes every row
+    (or every masked run of a row) with one slice assignment, flips and
+    rotations build the new rows from slices of the old ones.
+    """
+
+    def __init__(self, width, height, data, mask=None):
+        self.width = width
+        self.height = height
+        self.data = bytes(data)
+        self.mask = None if mask is None else bytes(mask)
+
+    @classmethod
+    def from_spans(cls, pixels, canvas_width, spans):
+        """Copy the pixels covered by (y, x0, x1) spans, one slice per bounding box row."""
+        x0 = min(span[1] for span in spans)
+        x1 = max(span[2] for span in spans)
+        y0 = min(span[0] for span in spans)
+        y1 = max(span[0] for span in spans)
+        width, height = x1 - x0 + 1, y1 - y0 + 1
+        data = bytearray()
+        for y in range(y0, y1 + 1):
+            start = y * canvas_width + x0
+            data += pixels[start:start + width]
+        mask = bytearray(width * height)
+        for y, left, right in spans:
+            start = (y - y0) * width + left - x0
+            mask[start:start + right - left + 1] = b'\x01' * (right - left + 1)
+        if mask.count(0) == 0:
+            mask = None  # a plain rectangle
+        return cls(width, height, data, mask), (x0, y0)
+
+    def rows(self, plane):
+        # the rows of a width x height plane (data or mask)
+        return [plane[y * self.width:(y + 1) * self.width] for y in range(self.height)]
+
+    def runs(self, y):
+        """(x0, x1) exclusive ranges of row y that the clip covers."""
+        if self.mask is None:
+            return [(0, self.width)]
+        offset = y * self.width
+        return [(run.start() - offset, run.end() - offset)
+                for run in SELECTED.finditer(self.mask, offset, offset + self.width)]
+
+    def transformed(self, transform):
+        # transform maps a plane to (width, height, plane), applied to data and mask
+        width, height, data = transform(self.data)
+        mask = None if self.mask is None else transform(self.mask)[2]
+        return Clip(width, height, data, mask)
+
+    def flipped_horizontal(self):
+        return self.transformed(lambda plane: (self.width, self.height,
+                                               b''.join(row[::-1] for row in self.rows(plane))))
+
+    def flipped_vertical(self):
+        return self.transformed(lambda plane: (self.width, self.height,
+                                               b''.join(reversed(self.rows(plane)))))
+
+    def rotated(self):
+        """Turned 90° clockwise: column x read bottom up is the new row x."""
+        width = self.width
+        return self.transformed(lambda plane: (self.height, width,
+                                               b''.join(plane[x::width][::-1] for x in range(width))))
@@ -0,0 +1,79 @@
+# Frame timing and call counts for --stats / --profile
+
+import time
+from collections import deque
+
+
+def percentile(values, fraction):
+    ordered = sorted(values)
+    return ordered[round(fraction * (len(ordered) - 1))]
+
+
+class FrameStats:
+    """Opt-in instrumentation of the editor loop.
+
+    Every frame (one batch of keys and the redraw that follows) gets the
+    time spent in each phase, in seconds, the pixels written, the view
+    cells drawn and the addch/addstr calls that drew them. `last` is the previous frame, summary() gives
+    p50/p95/max over the session.
+    """
+
+    PHASES = ("input", "tool", "autosave", "display", "refresh")
+    COUNTERS = ("put_pixel", "cells", "addch", "addstr")
+
+    def __init__(self, keep=100000):
+        self.frames = deque(maxlen=keep)
+        self.last = None
+        self.current = self.new_frame()
+
+    def new_frame(self):
+        return dict.fromkeys(self.PHASES + self.COUNTERS + ("keys", "latency"), 0)
+
+    def add(self, name, value=1):
+        self.current[name] += value
+
+    def timed(self, phase, function):
+        # function wrapped so its time is added to `phase`
+        def wrapper(*args, **kwargs):
+            start = time.perf_counter()
+            try:
+                return function(*args, **kwargs)
+            finally:
+                self.current[phase] += time.perf_counter() - start
+        return wrapper
+
+    def counted(self, counter, function, amount=lambda *args: 1):
+        # function wrapped so `amount` of its arguments is added to `counter`
+        def wrapper(*args, **kwargs):
+            self.current[counter] += amount(*args, **kwargs)
+            return function(*args, **kwargs)
+        return wrapper
+
+    def end_frame(self, latency):
+        # latency: from reading the first key of the batch to the frame being on screen
+        self.current["latency"] = latency
+        self.frames.append(self.current)
+        self.last = self.current
+        self.current = self.new_frame()
+
+    def live_text(self):
+        """Short numbers of the last frame for the info bar (ms)."""
+        if not self.last:
+            return ""
+        frame = self.last
+        return "in:{:.1f} tool:{:.1f} view:{:.1f} ref:{:.1f} px:{} cells:{} ch:{}".format(
+            frame["input"] * 1000, frame["tool"] * 1000, frame["display"] * 1000, frame["refresh"] * 1000,
+            frame["put_pixel"], frame["cells"], frame["addch"] + frame["addstr"])
+
+    def summary(self):
+        if not self.frames:
+            return "No frames recorded."
+        lines = [f"{len(self.frames)} frames, {sum(frame['keys'] for frame in self.frames)} keys",
+                 f"{'':12}{'p50':>10}{'p95':>10}{'max':>10}"]
+        for name in ("latency",) + self.PHASES:
+            values = [frame[name] * 1000 for frame in self.frames]
+            lines.append(f"{name + ' ms':12}{percentile(values, 0.5):10.3f}{percentile(values, 0.95):10.3f}{max(values):10.3f}")
+        for name in self.COUNTERS:
+            values = [frame[name] for frame in self.frames]
+            lines.append(f"{name:12}{percentile(values, 0.5):10}{percentile(values, 0.95):10}{max(values):10}")
+        return "\n".join(lines)
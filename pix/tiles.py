@@ -0,0 +1,176 @@
+# Sparse tiled storage of the canvas: very large images and animation frames
+
+TILE_SIZE = 64 # Pixels per side of a tile
+
+
+class TiledPixels:
+    """Palette indexes kept in TILE_SIZE x TILE_SIZE tiles created on first write.
+
+    It stands in for the flat row major bytearray of a Canvas: len(),
+    indexing, slice reads (bytes) and slice writes use the same flat
+    offsets, and bytes() gives the whole plane. A tile that was never
+    written is blank (index 0) and takes no memory, writing blank pixels
+    to it does not create it. Memory and the cost of a snapshot follow the
+    tiles that were drawn on, not the canvas size.
+    """
+
+    def __init__(self, width, height, tile=TILE_SIZE):
+        self.width = width
+        self.height = height
+        self.tile = tile
+        self.tiles = {}  # (tile x, tile y) -> bytearray(tile * tile)
+
+    @classmethod
+    def from_bytes(cls, width, height, data, tile=TILE_SIZE):
+        pixels = cls(width, height, tile)
+        pixels.write(0, data)
+        return pixels
+
+    def __len__(self):
+        return self.width * self.height
+
+    def __bytes__(self):
+        return self.read(0, len(self))
+
+    def __getitem__(self, key):
+        if isinstance(key, slice):
+            start, stop, _ = key.indices(len(self))
+            return self.read(start, stop)
+        if key < 0:
+            key += len(self)
+        y, x = divmod(key, self.width)
+        tile = self.tiles.get((x // self.tile, y // self.tile))
+        if tile is None:
+            return 0
+        return tile[(y % self.tile) * self.tile + x % self.tile]
+
+    def __setitem__(self, key, value):
+        if isinstance(key, slice):
+            start, stop, _ = key.indices(len(self))
+            if len(value) != stop - start:
+                raise ValueError("TiledPixels slice assignment can't change the size")
+            self.write(start, value)
+        else:
+            if key < 0:
+                key += len(self)
+            self.write(key, bytes([value]))
+
+    def read(self, start, stop):
+        out = bytearray()
+        while start < stop:
+            y, x = divmod(start, self.width)
+            end = min(self.width, x + stop - start)
+            self.read_row(y, x, end, out)
+            start += end - x
+        return bytes(out)
+
+    def read_row(self, y, x0, x1, out):
+        size = self.tile
+        ty, row = divmod(y, size)
+        row *= size
+        for tx in range(x0 // size, (x1 - 1) // size + 1):
+            left = max(x0, tx * size)
+            right = min(x1, (tx + 1) * size)
+            tile = self.tiles.get((tx, ty))
+            if tile is None:
+                out += self.missing(y * self.width + left, y * self.width + right)
+            else:
+                offset = row - tx * size
+                out += tile[offset + left:offset + right]
+
+    def write(self, start, data):
+        position = 0
+        while position < len(data):
+            y, x = divmod(start + position, self.width)
+            count = min(self.width - x, len(data) - position)
+            self.write_row(y, x, data[position:position + count])
+            position += count
+
+    def write_row(self, y, x0, data):
+        size = self.tile
+        ty, row = divmod(y, size)
+        row *= size
+        x1 = x0 + len(data)
+        for tx in range(x0 // size, (x1 - 1) // size + 1):
+            left = max(x0, tx * size)
+            right = min(x1, (tx + 1) * size)
+            chunk = data[left - x0:right - x0]
+            tile = self.tiles.get((tx, ty))
+            if tile is None:
+                if chunk == self.missing(y * self.width + left, y * self.width + right):
+                    continue  # writes what is already there, e.g. blank on blank
+                tile = self.tiles[(tx, ty)] = self.new_tile(tx, ty)
+            offset = row - tx * size
+            tile[offset + left:offset + right] = chunk
+
+    def missing(self, start, end):
+        # content of a flat range inside a tile that isn't stored
+        return bytes(end - start)
+
+    def new_tile(self, tx, ty):
+        return bytearray(self.tile * self.tile)
+
+    def ranges(self):
+        """Flat (start, end) ranges of the stored tiles, one per tile row."""
+        size = self.tile
+        ranges = []
+        for tx, ty in sorted(self.tiles, key=lambda key: (key[1], key[0])):
+            left = tx * size
+            right = min(left + size, self.width)
+            for y in range(ty * size, min((ty + 1) * size, self.height)):
+                ranges.append((y * self.width + left, y * self.width + right))
+        return ranges
+
+    def stored_size(self):
+        return len(self.tiles) * self.tile * self.tile
+
+    def copy_tiles(self):
+        return {key: bytes(tile) for key, tile in self.tiles.items()}
+
+
+class DiffPixels(TiledPixels):
+    """Copy-on-write pixels of an animation frame, stored as a diff of a keyframe.
+
+    Reads of a tile that was never written come from `base` (the keyframe
+    pixels, which are not written to anymore), the first write to a tile
+    copies it from the base. Frames duplicated from the same keyframe
+    share it, each one only holds the tiles it changed.
+    """
+
+    def __init__(self, base, width, height, tile=TILE_SIZE):
+        super().__init__(width, height, tile)
+        self.base = base
+
+    def copy(self):
+        pixels = DiffPixels(self.base, self.width, self.height, self.tile)
+        pixels.tiles = {key: bytearray(tile) for key, tile in self.tiles.items()}
+        return pixels
+
+    def __getitem__(self, key):
+        if isinstance(key, slice):
+            return super().__getitem__(key)
+        if key < 0:
+            key += len(self)
+        y, x = divmod(key, self.width)
+        tile = self.tiles.get((x // self.tile, y // self.tile))
+        if tile is None:
+            return self.base[key]
+        return tile[(y % self.tile) * self.tile + x % self.tile]
+
+    def missing(self, start, end):
+        return bytes(self.base[start:end])
+
+    def new_tile(self, tx, ty):
+        size = self.tile
+        tile = bytearray(size * size)
+        left = tx * size
+        right = min(left + size, self.width)
+        for row, y in enumerate(range(ty * size, min((ty + 1) * size, self.height))):
+            tile[row * size:row * size + right - left] = self.base[y * self.width + left:y * self.width + right]
+        return tile
+
+    def ranges(self):
+        # the keyframe can be drawn on anywhere unless it is tiled itself
+        if isinstance(self.base, TiledPixels):
+            return sorted(set(self.base.ranges() + super().ranges()))
+        return [(0, len(self))]
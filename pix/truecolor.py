@@ -0,0 +1,149 @@
+# 24-bit color output for terminals that support it, without curses color pairs
+
+import curses
+import os
+import sys
+
+
+class TrueColorScreen:
+    """Stands in for the curses window and draws with 24-bit SGR escapes.
+
+    The renderer keeps calling addch/addstr with an attribute, here the
+    attribute is a pair number (plus A_REVERSE) and set_pair() says which
+    RGB colors it stands for, so there is no limit on pairs or palette
+    colors and no init_color/init_pair calls. Cells are collected until
+    flush(), which compares them with what is on the terminal and writes
+    the changed ones row by row: one cursor move per run of cells, one
+    color escape (cached per attribute) per color change and a single
+    os.write for the whole frame. The curses window is still used for the
+    keys and is never drawn on, so curses has nothing to repaint over it.
+    """
+
+    MAX_PAIRS = 1 << 16  # pair numbers stay below A_REVERSE
+
+    def __init__(self, window, out=None):
+        self.window = window
+        self.out = sys.stdout.fileno() if out is None else out
+        self.pairs = {0: (None, None)}  # pair -> (foreground, background) RGB, None is the default color
+        self.escapes = {}  # attribute -> SGR escape
+        self.pending = {}  # row -> {column: (char, attribute)} since the last flush
+        self.cursor = (0, 0)
+        self.written = 0  # bytes sent by the last flush
+        # curses does its first screen clear now, not over the first frame
+        window.refresh()
+        self.reset()
+
+    def reset(self):
+        # the terminal is blank: what each cell shows, as (char, escape)
+        self.height, self.width = self.window.getmaxyx()
+        self.shown = [[(' ', None)] * self.width for _ in range(self.height)]
+
+    def set_pair(self, pair, foreground, background):
+        self.pairs[pair] = (foreground, background)
+        self.escapes.pop(pair, None)
+        self.escapes.pop(pair | curses.A_REVERSE, None)
+
+    def attr(self, pair):
+        # what curses.color_pair() gives in the curses renderer
+        return pair
+
+    def escape(self, attr):
+        code = self.escapes.get(attr)
+        if code is None:
+            foreground, background = self.pairs.get(attr & ~curses.A_REVERSE, (None, None))
+            parts = ["0"]
+            parts.append("38;2;{};{};{}".format(*foreground) if foreground else "39")
+            parts.append("48;2;{};{};{}".format(*background) if background else "49")
+            if attr & curses.A_REVERSE:
+                parts.append("7")
+            code = self.escapes[attr] = "\x1b[" + ";".join(parts) + "m"
+        return code
+
+    # the curses window methods used by the renderer
+
+    def getmaxyx(self):
+        return self.window.getmaxyx()
+
+    def addch(self, y, x, char, attr=0):
+        if not (0 <= y < self.height and 0 <= x < self.width):
+            raise curses.error("addch() returned ERR")
+        self.pending.setdefault(y, {})[x] = (char if isinstance(char, str) else chr(char), attr)
+
+    def addstr(self, y, x, text, attr=0):
+        if not 0 <= y < self.height:
+            raise curses.error("addstr() returned ERR")
+        row = self.pending.setdefault(y, {})
+        for i, char in enumerate(text):
+            if not 0 <= x + i < self.width:
+                raise curses.error("addstr() returned ERR")
+            row[x + i] = (char, attr)
+
+    def addnstr(self, y, x, text, n, attr=0):
+        self.addstr(y, x, text[:n], attr)
+
+    def move(self, y, x):
+        self.cursor = (y, x)
+
+    def clrtoeol(self):
+        y, x = self.cursor
+        if 0 <= y < self.height:
+            row = self.pending.setdefault(y, {})
+            for column in range(x, self.width):
+                row[column] = (' ', 0)
+
+    def clear(self):
+        # also used after the terminal left curses mode (prompts): let curses
+        # clear and take the screen back, then everything is drawn again
+        self.window.clear()
+        self.window.refresh()
+        self.pending = {}
+        self.reset()
+
+    erase = clear
+
+    def noutrefresh(self):
+        pass
+
+    def refresh(self):
+        self.flush()
+
+    def flush(self):
+        if self.window.getmaxyx() != (self.height, self.width):
+            # resized: start from a blank terminal, KEY_RESIZE redraws the whole view
+            self.window.clear()
+            self.window.refresh()
+            self.reset()
+        out = []
+        last_escape = None
+        for y in sorted(self.pending):
+            if y >= self.height:
+                continue
+            shown = self.shown[y]
+            next_x = None
+            for x, (char, attr) in sorted(self.pending[y].items()):
+                if x >= self.width:
+                    continue
+                escape = self.escape(attr)
+                if shown[x] == (char, escape):
+                    continue
+                shown[x] = (char, escape)
+                if x != next_x:
+                    out.append("\x1b[{};{}H".format(y + 1, x + 1))
+                if escape != last_escape:
+                    out.append(escape)
+                    last_escape = escape
+                out.append(char)
+                next_x = x + 1
+        self.pending = {}
+        if not out:
+            self.written = 0
+            return
+        out.append("\x1b[0m")
+        data = "".join(out).encode("utf-8")
+        self.written = len(data)
+        while data:
+            data = data[os.write(self.out, data):]
+
+    def __getattr__(self, name):
+        # getch, nodelay, keypad... go to the curses window
+        return getattr(self.window, name)
@@ -0,0 +1,1256 @@
+# Terminal front-end of pix, curses rendering and key handling
+
+import curses
+import os
+import signal
+import time
+from collections import OrderedDict
+from itertools import groupby
+from operator import itemgetter
+
+from .autosave import Autosave
+from .canvas import Canvas, DEFAULT_SIZE
+from .pyramid import Pyramid
+from .truecolor import TrueColorScreen
+
+# Default key bindings
+
+default_keymap = {
+    "select_color_0": [ord('0')],
+    "select_color_1": [ord('1')],
+    "select_color_2": [ord('2')],
+    "select_color_3": [ord('3')],
+    "select_color_4": [ord('4')],
+    "select_color_5": [ord('5')],
+    "select_color_6": [ord('6')],
+    "select_color_7": [ord('7')],
+    "select_color_8": [ord('8')],
+    "select_color_9": [ord('9')],
+    "move_up": [curses.KEY_UP, ord('w')],
+    "move_down": [curses.KEY_DOWN, ord('s')],
+    "move_left": [curses.KEY_LEFT, ord('a')],
+    "move_right": [curses.KEY_RIGHT, ord('d')],
+    "perform_action": [ord(' '), ord('\n'), ord('x')],
+    "undo_action": [ord('u')],
+    "redo_action": [ord('U')],
+    "export_and_quit": [ord('e')],
+    "save_and_quit": [ord('q')],
+    "save_with_confirm": [ord('Q')],
+    "save": [ord('S')],
+    "toggle_info_bar": [ord('g')],
+    "increase_color": [ord('=')],
+    "decrease_color": [ord('-')],
+    "next_tool": [ord('+')],
+    "previous_tool": [ord('_')],
+    "select_tool_0": [ord('!')],
+    "select_tool_1": [ord('@')],
+    "select_tool_2": [ord('#')],
+    "select_tool_3": [ord('$')],
+    "select_tool_4": [ord('%')],
+    "select_tool_5": [ord('^')],
+    "select_tool_6": [ord('&')],
+    "select_tool_7": [ord('*')],
+    "select_tool_8": [ord('(')],
+    "select_tool_9": [ord(')')],
+    "bucket_fill": [ord('b')],
+    "toggle_horizontal_mirroring": [ord('h')],
+    "toggle_vertical_mirroring": [ord('v')],
+    "move_horizontal_mirroring": [ord('M')],
+    "move_vertical_mirroring": [ord('m')],
+    "hex_prompt": [ord('H')],
+    "hex_export": [ord('E')],
+    "next_render_mode": [ord('r')],
+    "toggle_overview": [ord('z')],
+    "zoom_in": [ord(']')],
+    "zoom_out": [ord('[')],
+    "add_layer": [ord('L')],
+    "delete_layer": [ord('X')],
+    "next_layer": [ord('l')],
+    "toggle_layer": [ord('o')],
+    "layer_opacity_up": [ord('}')],
+    "layer_opacity_down": [ord('{')],
+    "next_frame": [ord('.')],
+    "previous_frame": [ord(',')],
+    "add_frame": [ord('N')],
+    "duplicate_frame": [ord('n')],
+    "delete_frame": [ord('Y')],
+    "toggle_onion_skin": [ord('O')],
+    "copy_selection": [ord('c')],
+    "cut_selection": [ord('C')],
+    "paste": [ord('p')],
+    "clear_selection": [ord('D')],
+    "flip_clipboard_horizontal": [ord('f')],
+    "flip_clipboard_vertical": [ord('F')],
+    "rotate_clipboard": [ord('R')],
+}
+
+FRAME_INTERVAL=1/30 # Longest time spent on queued keys before a frame is drawn
+
+# Render modes: canvas pixels (width, height) shown by one terminal cell.
+# half draws two pixels per cell with ▀ and a foreground/background pair,
+# quadrant and braille pack more for an overview (two colors, one color per cell).
+RENDER_MODES = {"full": (1, 1), "half": (1, 2), "quadrant": (2, 2), "braille": (2, 4)}
+# quadrant characters by mask: top left 1, top right 2, bottom left 4, bottom right 8
+QUADRANTS = " ▘▝▀▖▌▞▛▗▚▐▜▄▙▟█"
+# braille dot bit of each pixel of the 2x4 cell, (x, y) -> bit
+BRAILLE_DOTS = {(0, 0): 0x01, (0, 1): 0x02, (0, 2): 0x04, (0, 3): 0x40,
+                (1, 0): 0x08, (1, 1): 0x10, (1, 2): 0x20, (1, 3): 0x80}
+
+def key_name(key):
+    if 32 < key < 127:
+        return chr(key)
+    return {ord(' '): "space", ord('\n'): "enter"}.get(key, str(key))
+
+def load_keymap(filename, keymap):
+    """Merge the keymap file over `keymap` and compile it to a key -> action name dict.
+
+    Bindings from the file win over the default ones. When one key is bound
+    to more than one action the first one is kept and the conflict is reported.
+    """
+    key_aliases = {
+        "space": ord(' '),
+        "enter": ord('\n'),
+        ";": ord(';'),
+        "dot": ord('.'),
+        "comma": ord(','),
+        ">": ord('>'),
+        "<": ord('<'),
+        # Add more aliases if needed
+    }
+
+    file_keymap = {}
+    if not os.path.exists(filename):
+        print(f"Keymap file '{filename}' not found. Using default key bindings.")
+    else:
+        try:
+            with open(filename, 'r') as file:
+                for line in file:
+                    if '::' in line:
+                        action, keys = line.strip().split('::')
+                        keys = keys.split(',')
+                        key_list = []
+                        for key in keys:
+                            key = key.strip()
+                            if len(key) == 1:  # Single character
+                                key_list.append(ord(key))
+                            elif key in key_aliases:
+                                key_list.append(key_aliases[key])
+                            else:
+                                raise ValueError(f"Unknown key alias: {key}")
+
+                        if action not in keymap:
+                            print(f"Unknown action in keymap file: {action}")
+                        file_keymap[action] = key_list
+
+        except ValueError as e:
+            print(f"Error in keymap file: {e}")
+
+    # File bindings first so they win, then the defaults that were not redefined
+    bindings = list(file_keymap.items())
+    bindings += [(action, keys) for action, keys in keymap.items() if action not in file_keymap]
+
+    compiled = {}
+    for action, keys in bindings:
+        for key in keys:
+            if key in compiled and compiled[key] != action:
+                print(f"Key '{key_name(key)}' is bound to both '{compiled[key]}' and '{action}', using '{compiled[key]}'.")
+                continue
+            compiled[key] = action
+
+    return compiled
+
+class Drawing(Canvas):
+    """Canvas shown in a curses window."""
+
+    def __init__(self, stdscr, width=64, height=64, view_size=64, filename=None, background=1, palette="palette.hex",
+                 render_mode="full", truecolor=False, **options):
+        # options are the Canvas ones (fill, undo, color matching, import)
+        # truecolor draws with 24-bit escapes (pix.truecolor) instead of curses colors
+        self.truecolor = truecolor
+        if truecolor:
+            self.stdscr = TrueColorScreen(stdscr)
+            self.color_attr = self.stdscr.attr
+        else:
+            self.stdscr = stdscr
+            self.color_attr = curses.color_pair
+        self.render_mode = render_mode
+        self.cell_w, self.cell_h = RENDER_MODES[render_mode]
+        # (foreground, background) curses colors -> pair, for the two color cells
+        # of the compact modes. Pairs are allocated on first use after the
+        # palette pairs, the least recently used one is reused when they run out.
+        self.pair_cache = OrderedDict()
+        self.next_pair = 1
+        # pairs the frame being drawn uses, they are never reused during it
+        self.frame_pairs = set()
+        self.info_bar=True
+        self.background_color=background
+        self.view_size = view_size
+        # Incremental rendering: top left canvas position of the view (None until the
+        # first frame centers it on the cursor) and what changed since the last frame
+        self.view_x = self.view_y = None
+        self.clear_screen = True
+        # palette indexes the view shows, the layers flattened (see display_view)
+        self.shown = None
+        # Onion skin: the previous and next frames show through blank pixels,
+        # (pixels, char) of each while it is on
+        self.onion_skin = False
+        self.onion = ()
+        self.last_cursor = None
+        self.preview_rect = None
+        self.preview_key = None
+        self.preview = {}
+        # Outline of the selection: row -> spans, and the selection it was made for
+        self.outline = {}
+        self.outline_of = None
+        self.outline_rect = None
+        # Info bar overlay state, it is only redrawn when it changes
+        self.hud_state = None
+        self.hud_text = None
+        self.hud_text_len = 0
+        self.frame_time = 0.0
+        # FrameStats when --stats is on, see enable_stats
+        self.stats = None
+        # Overview of the whole canvas: the pyramid level shown, None while editing
+        self.overview_level = None
+        self.overview_frame = None
+        self.overview_cursor = None
+        self.pyramid = Pyramid(self)
+        super().__init__(width, height, filename, palette, **options)
+
+    def initialize_colors(self):
+        if self.truecolor:
+            # exact colors, pairs are only names for the RGB colors
+            background = self.colors[self.background_color - 1] if self.background_color > 0 else None
+            for i, color in enumerate(self.colors):
+                self.stdscr.set_pair(i + 1, color, background)
+        else:
+            curses.start_color()
+            curses.use_default_colors()
+            # curses colors go from 1 to COLORS - 1, the palette can't hold more
+            self.max_colors = min(256, getattr(curses, "COLORS", 256) - 1)
+            for i, (r, g, b) in enumerate(self.colors[:self.max_colors]):
+                curses.init_color(i + 1, int(r * 1000 / 255), int(g * 1000 / 255), int(b * 1000 / 255))
+                curses.init_pair(i + 1, i + 1, self.background_color)
+        self.pair_cache.clear()
+        self.frame_pairs.clear()
+        self.next_pair = len(self.colors) + 1
+        # attribute of every palette pair (any index a pixel can hold), looked up
+        # per cell instead of calling color_pair()
+        self.pair_attrs = [self.color_attr(pair) for pair in range(257)]
+        super().initialize_colors()
+
+    def pair_for(self, fg, bg):
+        # color pair number of two curses colors
+        pair = self.pair_cache.get((fg, bg))
+        if pair is None:
+            limit = TrueColorScreen.MAX_PAIRS if self.truecolor else getattr(curses, "COLOR_PAIRS", 256)
+            if self.next_pair < limit:
+                pair = self.next_pair
+                self.next_pair += 1
+            else:
+                pair = next(iter(self.pair_cache.values()))
+                if pair in self.frame_pairs:
+                    # the least recently used pair is in this frame, so are all of them
+                    return self.closest_pair(fg, bg)
+                self.pair_cache.popitem(last=False)
+                if not self.truecolor:
+                    # curses recolors the cells already showing the pair
+                    self.request_redraw()
+            if self.truecolor:
+                self.stdscr.set_pair(pair, self.colors[fg - 1], self.colors[bg - 1])
+            else:
+                curses.init_pair(pair, fg, bg)
+            self.pair_cache[(fg, bg)] = pair
+        else:
+            self.pair_cache.move_to_end((fg, bg))
+        self.frame_pairs.add(pair)
+        return pair
+
+    def closest_pair(self, fg, bg):
+        # cached pair nearest to two curses colors, when none can be set up for them
+        def distance(key):
+            return sum((a - b) ** 2 for i, color in ((0, fg), (1, bg))
+                       for a, b in zip(self.colors[key[i] - 1], self.colors[color - 1]))
+        return self.pair_cache[min(self.pair_cache, key=distance)]
+
+    def set_render_mode(self, mode):
+        self.render_mode = mode
+        self.cell_w, self.cell_h = RENDER_MODES[mode]
+        self.last_cursor = None
+        # recenter, the view covers a different area now
+        self.view_x = self.cursor_x - self.view_size // 2
+        self.view_y = self.cursor_y - self.view_size // 2
+        self.view_x -= self.view_x % self.cell_w
+        self.view_y -= self.view_y % self.cell_h
+        self.request_redraw(clear=True)
+
+    def move_cursor(self, direction, step=1):
+        # in the overview the cursor moves one overview pixel
+        if self.overview_level:
+            step <<= self.overview_level
+        super().move_cursor(direction, step)
+
+    def perform_action(self):
+        if self.overview_level is not None:
+            self.toggle_overview()  # jump to the cursor
+            return
+        super().perform_action()
+
+    def toggle_overview(self):
+        if self.overview_level is None:
+            height, width = self.stdscr.getmaxyx()
+            self.pen_down = False
+            self.overview_level = self.pyramid.fit(width, height - 1)
+        else:
+            # back to editing, the view scrolls to wherever the cursor went
+            self.overview_level = None
+        self.overview_frame = None
+        self.overview_cursor = None
+        self.last_cursor = None
+        self.request_redraw(clear=True)
+
+    def zoom_out(self):
+        if self.overview_level is None:
+            self.toggle_overview()
+        else:
+            self.overview_level = min(self.overview_level + 1, len(self.pyramid.sizes) - 1)
+            self.request_redraw(clear=True)
+
+    def zoom_in(self):
+        if self.overview_level == 0:
+            self.toggle_overview()
+        elif self.overview_level:
+            self.overview_level -= 1
+            self.request_redraw(clear=True)
+
+    def next_render_mode(self):
+        modes = list(RENDER_MODES)
+        self.set_render_mode(modes[(modes.index(self.render_mode) + 1) % len(modes)])
+
+#    def update_cursor(self):
+#        self.stdscr.clear()
+#        self.display_view()
+#                                        
+#        if (self.pen_down):
+#            char='◘'
+#        else:
+#            char="•"
+#
+#        if self.color_pair != 1: # if black turn to white (cause black on black ain't visible)
+#            color = curses.color_pair(self.color_pair) # set to active color
+#        else:
+#            color = curses.color_pair(2) | curses.A_REVERSE # set to white
+#
+#
+#        self.stdscr.addch(self.view_size // 2, self.view_size // 2, char, color)
+#        self.stdscr.move(self.view_size // 2, self.view_size // 2)
+
+    def request_redraw(self, clear=False):
+        super().request_redraw()
+        if clear:
+            self.clear_screen = True
+
+    def dirty_view_rects(self):
+        # Convert the dirty canvas rectangles to view rectangles, clipped to the view
+        if self.cell_w * self.cell_h > 1:
+            return self.dirty_block_rects()
+        rects = []
+        last = self.view_size - 1
+        for x0, y0, x1, y1 in self.dirty_rects:
+            # pixels on the canvas edges are also shown by the wrap indicators
+            extra = [(x0, y0, x1, y1)]
+            if y0 == 0:
+                extra.append((x0, self.height, x1, self.height))
+            if y1 == self.height - 1:
+                extra.append((x0, -1, x1, -1))
+            if x0 == 0:
+                extra.append((self.width, y0, self.width, y1))
+            if x1 == self.width - 1:
+                extra.append((-1, y0, -1, y1))
+            for ex0, ey0, ex1, ey1 in extra:
+                vx0 = max(ex0 - self.view_x, -1)
+                vy0 = max(ey0 - self.view_y, -1)
+                vx1 = min(ex1 - self.view_x, last)
+                vy1 = min(ey1 - self.view_y, last)
+                if vx0 <= vx1 and vy0 <= vy1:
+                    rects.append((vx0, vy0, vx1, vy1))
+        return rects
+
+    def dirty_block_rects(self):
+        # same for the compact modes, where a cell covers a block of pixels
+        rects = []
+        cw, ch = self.cell_w, self.cell_h
+        last_x = -(-self.view_size // cw) - 1
+        last_y = -(-self.view_size // ch) - 1
+        for x0, y0, x1, y1 in self.dirty_rects:
+            vx0 = max((x0 - self.view_x) // cw, 0)
+            vy0 = max((y0 - self.view_y) // ch, 0)
+            vx1 = min((x1 - self.view_x) // cw, last_x)
+            vy1 = min((y1 - self.view_y) // ch, last_y)
+            if vx0 <= vx1 and vy0 <= vy1:
+                rects.append((vx0, vy0, vx1, vy1))
+        return rects
+
+    def hand_off_changes(self):
+        # Pixels changed since the last frame go to the autosave thread and the overview pyramid
+        changed = bool(self.changed_rects)
+        for rect in self.changed_rects:
+            self.pyramid.invalidate(*rect)
+        if self.autosave and changed:
+            self.autosave.write_rects(self, self.changed_rects)
+        self.changed_rects = []
+        return changed
+
+    def update_overview(self):
+        # Whole canvas from a pyramid level, two overview pixels per cell like
+        # the half mode. The last row is a status line.
+        height, width = self.stdscr.getmaxyx()
+        if self.hand_off_changes():
+            self.full_redraw = True
+        if self.clear_screen:
+            self.stdscr.clear()
+            self.clear_screen = False
+            self.full_redraw = True
+
+        frame_start = time.perf_counter()
+        self.frame_pairs.clear()
+        k = self.overview_level
+        w, h, pixels = self.pyramid.level(k)
+        rows = max(height - 1, 1)
+        # levels larger than the terminal scroll with the cursor
+        cx, cy = self.cursor_x >> k, self.cursor_y >> k
+        ox = min(max(cx - width // 2, 0), max(w - width, 0))
+        oy = min(max(cy - rows, 0), max(h - 2 * rows, 0))
+        oy -= oy % 2
+
+        def draw(x, y):
+            top = bottom = None
+            px, py = ox + x, oy + 2 * y
+            if px < w:
+                if py < h:
+                    top = pixels[py * w + px]
+                if py + 1 < h:
+                    bottom = pixels[(py + 1) * w + px]
+            try:
+                self.stdscr.addch(y, x, *self.half_block(top, bottom))
+            except curses.error:
+                pass
+
+        def draw_all():
+            for y in range(min(rows, (h - oy + 1) // 2)):
+                for x in range(min(width, w - ox)):
+                    draw(x, y)
+
+        frame = (k, ox, oy, width, height)
+        if self.full_redraw or frame != self.overview_frame:
+            draw_all()
+            self.overview_frame = frame
+        elif self.overview_cursor:
+            draw(*self.overview_cursor)
+            if self.full_redraw:
+                # a color pair was reused, the cells drawn before may show it
+                draw_all()
+        self.full_redraw = False
+        self.dirty_rects = []
+
+        cursor = (cx - ox, (cy - oy) // 2)
+        self.overview_cursor = cursor
+        if self.color_pair != 1:
+            color = self.color_attr(self.color_pair)
+        else:
+            color = self.color_attr(2) | curses.A_REVERSE
+        status = "Overview 1:{} {},{} (enter: jump, [ ]: zoom, z: back)".format(1 << k, self.cursor_x, self.cursor_y)
+        try:
+            self.stdscr.addch(cursor[1], cursor[0], "•", color)
+            self.stdscr.move(height - 1, 0)
+            self.stdscr.clrtoeol()
+            self.stdscr.addnstr(height - 1, 0, status, width - 1, self.color_attr(2))
+        except curses.error:
+            pass
+        self.refresh_screen()
+        self.frame_time = time.perf_counter() - frame_start
+
+    def update_cursor(self):
+        if self.overview_level is not None:
+            self.update_overview()
+            return
+
+        # Get the terminal size
+        height, width = self.stdscr.getmaxyx()
+        cw, ch = self.cell_w, self.cell_h
+        view_w = min(self.view_size, width * cw)
+        view_h = min(self.view_size, height * ch)
+
+        # The view only scrolls when the cursor leaves it, so a cursor move
+        # inside the view only repaints the old and the new cursor cells.
+        if self.view_x is None or not (0 <= self.cursor_x - self.view_x < view_w and
+                                       0 <= self.cursor_y - self.view_y < view_h):
+            self.center_view()
+
+        if self.clear_screen:
+            # the terminal was used outside of curses (prompts), start over
+            self.stdscr.clear()
+            self.clear_screen = False
+            self.full_redraw = True
+
+        # Tool preview (line, rect, ellipse, and the selection being made):
+        # the pending shape is rasterized once here and cell() only looks up its row.
+        if self.pen_down and self.tool_id in (3, 4, 5):
+            preview_key = (self.tool_id, self.x1, self.y1, self.cursor_x, self.cursor_y, self.mirror_h, self.mirror_v)
+        elif self.pen_down and self.tool_id in (7, 8):
+            preview_key = (self.tool_id, self.x1, self.y1, self.cursor_x, self.cursor_y, len(self.lasso))
+        else:
+            preview_key = None
+        if preview_key != self.preview_key:
+            if self.preview_rect:
+                self.mark_dirty_mirrored(*self.preview_rect, changed=False)
+                self.preview_rect = None
+            # row -> spans of the preview, for a quick lookup in cell()
+            self.preview = {}
+            if preview_key and self.tool_id in (7, 8):
+                # selections are not mirrored
+                spans = self.selecting_spans()
+                for y, x0, x1 in spans:
+                    self.preview.setdefault(y, []).append((x0, x1))
+                if spans:
+                    self.preview_rect = self.spans_rect(spans)
+                    self.mark_dirty(*self.preview_rect, changed=False)
+            elif preview_key:
+                for y, x0, x1 in self.mirror_spans(self.shape_spans(self.tool_id)):
+                    self.preview.setdefault(y, []).append((x0, x1))
+                x1, x2 = sorted([self.x1, self.cursor_x])
+                y1, y2 = sorted([self.y1, self.cursor_y])
+                self.preview_rect = (x1, y1, x2, y2)
+                self.mark_dirty_mirrored(*self.preview_rect, changed=False)
+            self.preview_key = preview_key
+
+        # Selection outline, rebuilt when the selection changes
+        if self.selection is not self.outline_of:
+            if self.outline_rect:
+                self.mark_dirty(*self.outline_rect, changed=False)
+                self.outline_rect = None
+            self.outline = {}
+            if self.selection:
+                for y, x0, x1 in self.outline_spans(self.selection):
+                    self.outline.setdefault(y, []).append((x0, x1))
+                self.outline_rect = self.spans_rect(self.selection)
+                self.mark_dirty(*self.outline_rect, changed=False)
+            self.outline_of = self.selection
+
+        if self.last_cursor:
+            self.mark_dirty(*self.last_cursor, *self.last_cursor, changed=False)
+
+        self.hand_off_changes()
+
+        frame_start = time.perf_counter()
+        if self.full_redraw:
+            self.hud_text = None  # hud_text_len stays, the text may reach past the view
+            drawn_rects = self.display_view()
+        else:
+            self.full_redraw = False
+            drawn_rects = self.display_view(self.dirty_view_rects())
+            if self.full_redraw:
+                # a color pair was reused, cells outside of the dirty rects may show it
+                self.hud_text = None
+                drawn_rects = self.display_view()
+        self.draw_info_bar(drawn_rects)
+        self.full_redraw = False
+        self.dirty_rects = []
+        self.last_cursor = (self.cursor_x, self.cursor_y)
+
+        # Cursor position inside the view, kept within the terminal bounds
+        center_y = min((self.cursor_y - self.view_y) // ch, height - 1)
+        center_x = min((self.cursor_x - self.view_x) // cw, width - 1)
+        
+        if self.pen_down:
+            char = '◘'
+        else:
+            char = "•"
+
+        if self.color_pair != 1:  # if black turn to white (cause black on black ain't visible)
+            color = self.color_attr(self.color_pair)  # set to active color
+        else:
+            color = self.color_attr(2) | curses.A_REVERSE  # set to white
+
+        try:
+            # Place character at the cursor position
+            self.stdscr.addch(center_y, center_x, char, color)
+            self.stdscr.move(center_y, center_x)
+        except curses.error:
+            # Optionally handle if terminal is too small even after adjustment
+            pass  # Safely ignore errors if terminal too small
+
+        self.refresh_screen()
+        self.frame_time = time.perf_counter() - frame_start
+
+    def center_view(self):
+        # Put the cursor in the middle of the part of the view the terminal shows
+        height, width = self.stdscr.getmaxyx()
+        view_w = min(self.view_size, width * self.cell_w)
+        view_h = min(self.view_size, height * self.cell_h)
+        self.view_x = self.cursor_x - view_w // 2
+        self.view_y = self.cursor_y - view_h // 2
+        # in the compact modes cells start on a block boundary
+        self.view_x -= self.view_x % self.cell_w
+        self.view_y -= self.view_y % self.cell_h
+        self.full_redraw = True
+
+    def spans_rect(self, spans):
+        # bounding (x0, y0, x1, y1) of spans
+        return (min(span[1] for span in spans), min(span[0] for span in spans),
+                max(span[2] for span in spans), max(span[0] for span in spans))
+
+    def refresh_screen(self):
+        # Only the cells touched since the last frame are sent to the terminal
+        if self.truecolor:
+            self.stdscr.flush()
+        else:
+            self.stdscr.noutrefresh()
+            curses.doupdate()
+
+    def enable_stats(self, stats):
+        # Wrap the measured methods, nothing is timed or counted when stats are off
+        self.stats = stats
+        # every canvas write (pixel, span, fill, paste) records its range for undo first
+        self.history.record = stats.counted("put_pixel", self.history.record,
+                                            lambda pixels, start, end: end - start)
+        self.display_view = stats.timed("display", self.display_view)
+        self.refresh_screen = stats.timed("refresh", self.refresh_screen)
+        if self.autosave:
+            self.autosave.write_rects = stats.timed("autosave", self.autosave.write_rects)
+        self.stdscr = CountingScreen(self.stdscr, stats)
+
+    def get_closest_color_id(self, rr, gg, bb):
+        # color id of the nearest palette color (palette index + 2, like cell() uses)
+        closest_index = self.matcher.match((rr, gg, bb))
+        if closest_index+1 in self.color_pairs:
+            return self.color_pairs[closest_index+1]
+        else:
+            return -1
+
+    def display_view(self, rects=None):
+        # rects are (x0, y0, x1, y1) view cells to draw (inclusive), None redraws the whole view
+        if self.view_x is None:
+            self.center_view()  # drawn before the first update_cursor
+        # one ready buffer for the whole frame, layers are never blended per cell
+        self.shown = self.view_pixels()
+        self.frame_pairs.clear()
+        self.onion = self.onion_frames() if self.onion_skin else ()
+        if self.cell_w * self.cell_h > 1:
+            return self.display_blocks(rects)
+        if rects is None:
+            rects = [(-1, -1, self.view_size - 1, self.view_size - 1)]
+        for x0, y0, x1, y1 in rects:
+            for y in range(y0, y1 + 1):
+                self.draw_runs(y, x0, self.row_cells(y, x0, x1))
+
+        return rects
+
+    def draw_runs(self, y, x, cells):
+        # cells is the (char, attr) list of a row from view column x,
+        # every run of one attribute is sent with a single addstr
+        height, width = self.stdscr.getmaxyx()
+        if not 0 <= y < height:
+            return
+        if x < 0:
+            cells = cells[-x:]
+            x = 0
+        cells = cells[:width - x]  # addstr would wrap to the next row
+        for attr, run in groupby(cells, itemgetter(1)):
+            text = "".join(map(itemgetter(0), run))
+            try:
+                self.stdscr.addstr(y, x, text, attr)
+            except curses.error:
+                pass  # the bottom right cell, curses can't move the cursor past it
+            x += len(text)
+
+    def row_cells(self, y, x0, x1):
+        # (char, attr) of the view cells x0..x1 of a row in the full render mode
+        img_y = self.view_y + y
+        start_x = self.view_x
+        # inside of the borders a row is '█' in the pixel colors, unless there is
+        # a guide, the preview or the onion skin on it: read it in one slice
+        left = max(start_x + x0, 1)
+        right = min(start_x + x1, self.width - 2)
+        plain = (0 < img_y < self.height - 1 and not self.onion and img_y not in self.preview
+                 and img_y not in self.outline
+                 and not (self.mirror_v and img_y == int(self.height / 2)+int(self.mirror_y_offset/2)))
+        if not plain or left > right:
+            return [self.cell(img_x, img_y) for img_x in range(start_x + x0, start_x + x1 + 1)]
+        cells = [self.cell(img_x, img_y) for img_x in range(start_x + x0, left)]
+        attrs = self.pair_attrs
+        offset = img_y * self.width
+        cells += [('█', attrs[index + 1]) for index in self.shown[offset + left:offset + right + 1]]
+        if self.mirror_h:
+            guide = int(self.width / 2)+int(self.mirror_x_offset/2)
+            if left <= guide <= right:
+                cells[guide - start_x - x0] = self.cell(guide, img_y)
+        cells += [self.cell(img_x, img_y) for img_x in range(right + 1, start_x + x1 + 1)]
+        return cells
+
+    def onion_frames(self):
+        # full mode only, the compact modes have no room for it
+        if self.cell_w * self.cell_h > 1:
+            return ()
+        onion = []
+        if self.frame_index > 0:
+            onion.append((self.frame_view(self.frames[self.frame_index - 1]), '░'))
+        if self.frame_index < len(self.frames) - 1:
+            onion.append((self.frame_view(self.frames[self.frame_index + 1]), '▒'))
+        return onion
+
+    def toggle_onion_skin(self):
+        self.onion_skin = not self.onion_skin
+
+    def draw_info_bar(self, drawn_rects):
+        # HUD overlay, drawn once per frame on top of the view.
+        # The swatches are only redrawn when the tool, the active color or the
+        # info bar changed, or when canvas cells under them were repainted.
+        if not self.info_bar:
+            self.clear_hud_text(0)
+            self.hud_text = None
+            self.hud_text_len = 0
+            return
+
+        mirror = ("H" if self.mirror_h else "") + ("V" if self.mirror_v else "")
+        text = "{} {},{} M:{} {:.1f}ms".format(self.tools[self.tool_id], self.cursor_x, self.cursor_y,
+                                               mirror or "-", self.frame_time * 1000)
+        if len(self.frames) > 1:
+            text += " F:{}/{}".format(self.frame_index + 1, len(self.frames))
+        if len(self.layers) > 1:
+            layer = self.layers[self.active_layer]
+            text += " L:{}/{}{} {}%".format(self.active_layer + 1, len(self.layers),
+                                            "" if layer.visible else " hidden", layer.opacity)
+        if self.stats:
+            text += " " + self.stats.live_text()
+        state = (self.tool_id, self.color_pair, self.info_bar)
+
+        offset_y=2
+        offset_x=2
+        # view areas covered by the status text and the swatches
+        text_area = (1, 1, self.hud_text_len, 1)
+        swatch_area = (offset_x, offset_y+1, offset_x, offset_y+10)
+
+        def overlaps(area):
+            return any(x0 <= area[2] and area[0] <= x1 and y0 <= area[3] and area[1] <= y1
+                       for x0, y0, x1, y1 in drawn_rects)
+
+        try:
+            # give back the cells the previous (longer) text was covering
+            self.clear_hud_text(len(text))
+            if text != self.hud_text or overlaps(text_area):
+                self.stdscr.addstr(1, 1, text, self.color_attr(2))
+
+            if state != self.hud_state or overlaps(swatch_area):
+                for i in range(1,11):
+                    index=i
+                    if self.color_pair==index:
+                        # active color
+                        # chars: •█
+                        char="•"
+                    else:
+                        char=str(i-1)
+
+                    # make black visible
+                    if index > 1:
+                        self.stdscr.addch(offset_y+i, offset_x, char, self.color_attr(index) | curses.A_REVERSE)
+                    else:
+                        self.stdscr.addch(offset_y+i, offset_x, char, self.color_attr(2))
+        except curses.error:
+            pass  # terminal too small for the info bar
+
+        self.hud_text = text
+        self.hud_text_len = len(text)
+        self.hud_state = state
+
+    def clear_hud_text(self, start):
+        # columns 1 + start to hud_text_len of the status row: the canvas inside
+        # of the view, blank past it
+        end = self.hud_text_len
+        if start >= end:
+            return
+        last = -(-self.view_size // self.cell_w) - 1  # last column of the view
+        if 1 + start <= last:
+            self.display_view([(1 + start, 1, min(end, last), 1)])
+        if end > last:
+            x = max(1 + start, last + 1)
+            width = self.stdscr.getmaxyx()[1]
+            try:
+                self.stdscr.addstr(1, x, ' ' * (min(end, width - 1) - x + 1), self.color_attr(1))
+            except curses.error:
+                pass
+
+    def display_blocks(self, rects=None):
+        # compact modes: every cell shows a cell_w x cell_h block of pixels
+        if rects is None:
+            rects = [(0, 0, -(-self.view_size // self.cell_w) - 1, -(-self.view_size // self.cell_h) - 1)]
+        cell = self.half_cell if self.render_mode == "half" else self.block_cell
+        for x0, y0, x1, y1 in rects:
+            for y in range(y0, y1 + 1):
+                self.draw_runs(y, x0, [cell(x, y) for x in range(x0, x1 + 1)])
+        return rects
+
+    def block_pixel(self, x, y):
+        # palette index shown at a canvas position, None outside of the canvas
+        if not (0 <= x < self.width and 0 <= y < self.height):
+            return None
+        if y in self.preview and any(x0 <= x <= x1 for x0, x1 in self.preview[y]):
+            return self.color_pair - 1  # tool preview in the active color
+        return self.shown[y * self.width + x]
+
+    def half_cell(self, x, y):
+        # ▀ with the top pixel as foreground and the bottom one as background
+        img_x = self.view_x + x
+        img_y = self.view_y + y * 2
+        top = bottom = None
+        if 0 <= img_x < self.width:
+            if img_y in self.preview or img_y + 1 in self.preview:
+                top = self.block_pixel(img_x, img_y)
+                bottom = self.block_pixel(img_x, img_y + 1)
+            else:
+                if 0 <= img_y < self.height:
+                    top = self.shown[img_y * self.width + img_x]
+                if 0 <= img_y + 1 < self.height:
+                    bottom = self.shown[(img_y + 1) * self.width + img_x]
+        return self.half_block(top, bottom)
+
+    def half_block(self, top, bottom):
+        # (char, attr) of a cell showing two palette indexes, None is outside of the canvas
+        attrs = self.pair_attrs
+        if top is None and bottom is None:
+            return ' ', attrs[0]
+        if bottom is None:
+            return '▀', attrs[top + 1]
+        if top is None:
+            return '▄', attrs[bottom + 1]
+        if top == bottom:
+            return '█', attrs[top + 1]
+        return '▀', self.color_attr(self.pair_for(top + 1, bottom + 1))
+
+    def block_cell(self, x, y):
+        # quadrant: the two most used colors of the 2x2 block,
+        # braille: the non blank pixels of the 2x4 block, in their most used color
+        img_x = self.view_x + x * self.cell_w
+        img_y = self.view_y + y * self.cell_h
+        block = [((dx, dy), self.block_pixel(img_x + dx, img_y + dy))
+                 for dy in range(self.cell_h) for dx in range(self.cell_w)]
+        counts = {}
+        for _, index in block:
+            if index is not None and (index or self.render_mode == "quadrant"):
+                counts[index] = counts.get(index, 0) + 1
+        ranked = sorted(counts, key=counts.get, reverse=True)
+
+        if not ranked:
+            char, attr = ' ', self.pair_attrs[0]
+        elif self.render_mode == "braille":
+            mask = sum(BRAILLE_DOTS[position] for position, index in block if index)
+            char, attr = chr(0x2800 + mask), self.pair_attrs[ranked[0] + 1]
+        elif len(ranked) == 1:
+            char, attr = '█', self.pair_attrs[ranked[0] + 1]
+        else:
+            fg, bg = ranked[0], ranked[1]
+            mask = sum(1 << (dy * 2 + dx) for (dx, dy), index in block if index == fg)
+            char, attr = QUADRANTS[mask], self.color_attr(self.pair_for(fg + 1, bg + 1))
+        return char, attr
+
+    def cell(self, img_x, img_y):
+        # (char, attr) the full render mode shows for a canvas position
+        color_id=0
+        char=" "
+        closest=color_id
+
+        # check if within the image canvas
+        if 0 <= img_x < self.width and 0 <= img_y < self.height:
+            # palette index of the current pixel, index 0 is the blank (black) color
+            index = self.shown[img_y * self.width + img_x]
+            closest = index + 2
+
+            # set the color id to black if blank
+            if index == 0:
+                color_id = 3
+            else:
+                color_id = closest
+
+            # Assigning the char
+            if img_y == 0 or img_y == self.height-1 or img_x == 0 or img_x == self.width-1:
+                # borders
+                if index == 0:
+                    char = '.'
+                else:
+                    char = '█'
+            elif (img_x == int(self.width / 2)+int(self.mirror_x_offset/2) and self.mirror_h):
+                # Vertical guideline for mirror mode
+                char = '|'
+                if index == 0:
+                    color_id = 3
+                else:
+                    color_id = closest
+            elif (img_y == int(self.height / 2)+int(self.mirror_y_offset/2) and self.mirror_v):
+                # Horizontal guideline for mirror mode
+                char = '-'
+                if index == 0:
+                    color_id = 3
+                else:
+                    color_id = closest
+            else:
+                # PREVIEW TOOL
+
+                char = '█'
+                color_id = closest
+                if index == 0 and self.onion:
+                    # a blank pixel shows the neighbour frames, previous first
+                    for pixels, onion_char in self.onion:
+                        shade = pixels[img_y * self.width + img_x]
+                        if shade:
+                            char = onion_char
+                            color_id = shade + 2
+                            break
+                if img_y in self.outline and any(x0 <= img_x <= x1 for x0, x1 in self.outline[img_y]):
+                    char = ':'  # selection border, in the pixel color
+                if img_y in self.preview and any(x0 <= img_x <= x1 for x0, x1 in self.preview[img_y]):
+                    char = 'x'
+                    color_id = self.color_pair + 1
+
+                    # Make black visible as white
+                    if color_id == 2:
+                        color_id = 3
+
+        elif img_x > 0 and img_x < self.width:
+                color_id=3
+                char = ' '
+                if (img_y == -1):
+                    color_id = self.shown[(self.height-1) * self.width + img_x] + 2
+                    char = '▲'
+                if (img_y == self.height):
+                    color_id = self.shown[img_x] + 2
+                    char = '▼'
+        elif img_y > 0 and img_y < self.height:
+                color_id=3
+                char = ' '
+                if (img_x == -1):
+                    color_id = self.shown[img_y * self.width + self.width-1] + 2
+                    char = '◀'
+                if (img_x == self.width):
+                    color_id = self.shown[img_y * self.width] + 2
+                    char = '▶'
+        else:
+            char = ' '
+            color_id = 3
+
+        color_id = 1 if color_id is None else color_id
+
+        if color_id > 1:
+            # Color character only
+            return char, self.pair_attrs[color_id-1]
+            #else:
+            #    self.stdscr.addch(y, x, "z", curses.color_pair(12))
+        else:
+            # Default color
+            return char, self.pair_attrs[1]
+
+    def rgb_prompt(self):
+        curses.endwin()  # End curses mode to allow normal input
+        # Could be a single input taking hex value instead
+        r=input("R: ")
+        g=input("G: ")
+        b=input("B: ")
+        self.color= (int(r),int(g),int(b))
+        #curses.initscr()
+        color_id=self.get_closest_color_id(int(r),int(g),int(b))
+        
+        #self.set_color(color_id)
+        curses.setupterm()
+
+    def hex_prompt(self):
+        if self.color_pair<3: # don't overwrite the default (black and white)
+            self.color_pair=3
+        curses.endwin()  # End curses mode to allow normal input
+        hex_color = input("Enter hex color (e.g., #ff5733 or ff5733): ").strip()
+
+        # Remove the '#' if it's present
+        if hex_color.startswith("#"):
+            hex_color = hex_color[1:]
+
+        # Ensure the input is exactly 6 characters long
+        if len(hex_color) != 6:
+            raise ValueError("Invalid hex color. Please provide a 6-character hex value.")
+
+        # Convert hex to RGB
+        r = int(hex_color[0:2], 16)
+        g = int(hex_color[2:4], 16)
+        b = int(hex_color[4:6], 16)
+
+        # set the color and update the color palette
+        self.set_palette_color(self.color_pair-1, (r, g, b))
+        self.request_redraw(clear=True)
+
+        curses.setupterm()
+
+    def export_colors_to_hex(self):
+        curses.endwin()  # End curses mode to allow normal input
+        self.request_redraw(clear=True)
+
+        # Prompt the user for the output file name
+        print("Exporting current color pallet to .hex file.")
+        filename = input("Enter the name for the output file (no extension): ")
+
+        # Prepare the file name with .hex extension
+        hex_filename = f"{filename}.hex"
+
+        try:
+            self.export_palette(hex_filename)
+            print(f"Colors exported successfully to {hex_filename}")
+        except IOError as e:
+            print(f"Error writing file {hex_filename}: {e}")
+
+    def save_image(self, filename=None, confirm="n"):
+        new_filename=""
+        if filename is None:
+            curses.endwin()  # End curses mode to allow normal input
+            self.request_redraw(clear=True)
+            filename = input("Enter filename (default 'out.png'): ").strip()
+            if not filename:
+                filename = "out.png"
+            #curses.setupterm()  # Restart curses mode
+            confirm="y"
+
+        if str(confirm.lower()) == "n":
+            curses.endwin()  # End curses mode to allow normal input
+            self.request_redraw(clear=True)
+            confirm = input("Save changes to "+str(filename)+"? (y/N): ").strip()
+            if str(confirm.lower()) != "y":
+                return 0            
+            new_filename = input("Enter filename (default '"+str(filename)+"'): ").strip()
+            
+        if new_filename != "":
+            filename=new_filename
+
+        # Replace spaces with underscores and convert to lowercase
+        filename = filename.replace(' ', '_').lower()
+
+        # animations can also be saved as .gif or .apng, a .png of one is a sprite sheet
+        if not filename.endswith(('.png', '.gif', '.apng')):
+            filename += '.png'
+            
+        if str(confirm.lower()) == "y":
+            self.export_image(filename)
+
+    def reset_image(self):
+        curses.endwin()  # End curses mode to allow normal input
+        confirm = input("Reset image? (y/N): ").strip()
+        if confirm.lower() == "y":
+            self.clear_image()
+        self.request_redraw(clear=True)
+        curses.initscr()  # Restart curses mode
+
+    def delete_layer(self):
+        if len(self.layers) == 1:
+            return
+        curses.endwin()  # End curses mode to allow normal input
+        confirm = input("Delete layer '" + self.layers[self.active_layer].name + "'? (y/N): ").strip()
+        if confirm.lower() == "y":
+            super().delete_layer()
+        self.request_redraw(clear=True)
+        curses.initscr()  # Restart curses mode
+
+    def delete_frame(self):
+        if len(self.frames) == 1:
+            return
+        curses.endwin()  # End curses mode to allow normal input
+        confirm = input("Delete frame " + str(self.frame_index + 1) + "? (y/N): ").strip()
+        if confirm.lower() == "y":
+            super().delete_frame()
+        self.request_redraw(clear=True)
+        curses.initscr()  # Restart curses mode
+
+    def build_actions(self):
+        """Keymap action name -> method, an action returning False quits."""
+        actions = super().build_actions()
+        actions.update({
+            "export_and_quit": self.export_and_quit,
+            "save_and_quit": self.save_and_quit,
+            "save_with_confirm": self.save_with_confirm,
+            "save": self.save,
+            "toggle_info_bar": self.toggle_info_bar,
+            "hex_prompt": self.hex_prompt,
+            "hex_export": self.export_colors_to_hex,
+            "next_render_mode": self.next_render_mode,
+            "toggle_overview": self.toggle_overview,
+            "zoom_in": self.zoom_in,
+            "zoom_out": self.zoom_out,
+            "toggle_onion_skin": self.toggle_onion_skin,
+        })
+        return actions
+
+    def toggle_info_bar(self):
+        self.info_bar = not self.info_bar
+
+    def save_and_quit(self):
+        # a project is saved when it is closed, PNG is only written by export
+        if not self.project:
+            self.save_image('pix.save.png')
+        return False
+
+    def save_with_confirm(self):
+        if not self.project:
+            self.save_image('pix.save.png', confirm="y")
+        return False
+
+    def save(self):
+        if self.project:
+            self.save_project()
+        else:
+            self.save_image('pix.save.png', confirm="y")
+
+    def export_and_quit(self):
+        self.save_image()  # asks for the file name
+        return False
+
+class CountingScreen:
+    """curses window that counts the addch and addstr calls, and the cells they draw, for FrameStats."""
+
+    def __init__(self, window, stats):
+        self.window = window
+        self.stats = stats
+
+    def addch(self, *args):
+        self.stats.current["addch"] += 1
+        self.stats.current["cells"] += 1
+        return self.window.addch(*args)
+
+    def addstr(self, y, x, text, *args):
+        self.stats.current["addstr"] += 1
+        self.stats.current["cells"] += len(text)
+        return self.window.addstr(y, x, text, *args)
+
+    def __getattr__(self, name):
+        return getattr(self.window, name)
+
+# Actions that mark their own dirty cells, any other key redraws the whole view
+LOCAL_ACTIONS = {"move_up", "move_down", "move_left", "move_right", "perform_action", "bucket_fill",
+                 "copy_selection", "cut_selection", "paste", "clear_selection",
+                 "flip_clipboard_horizontal", "flip_clipboard_vertical", "rotate_clipboard"}
+
+def handle_input(key, drawing, keymap):
+    # keymap is the key -> action name dict from load_keymap
+    stats = drawing.stats
+    if stats:
+        start = time.perf_counter()
+    action = keymap.get(key)
+    if action not in LOCAL_ACTIONS:
+        drawing.request_redraw()
+
+    if stats:
+        tool_start = time.perf_counter()
+        stats.add("input", tool_start - start)
+        stats.add("keys")
+    if action in drawing.actions:
+        if drawing.actions[action]() is False:
+            return False  # Quit
+
+    # Check for pen down and specific tools
+    if drawing.pen_down:
+        drawing.pen_step()
+    if stats:
+        stats.add("tool", time.perf_counter() - tool_start)
+
+    # drawing.update_cursor() is called by main, once per batch of keys
+    return True
+
+def main(stdscr, args, keymap):
+    #args = parse_arguments()
+#    args = sys.argv[1:]
+#    filename = single_argument(args)
+
+#    if (sys.argv[1:]):
+#        filename = str(sys.argv[1:])
+    #else:
+    filename = args.file if args.file else None
+    palette = args.palette if args.palette else "palette.hex"
+
+    #curses.curs_set(1)  # Make cursor visible
+
+    # Hide the cursor
+    curses.curs_set(0)
+    
+    stdscr.clear()
+
+    # so if args.width is passed make drawing.width equal to args.width if not argument passed use 64 as the default
+    #DEFAULT_SIZE = args.size if args.height
+    canvas_width = args.width if args.width else DEFAULT_SIZE
+    canvas_height = args.height if args.height else DEFAULT_SIZE
+
+    #background=args.background
+    try:
+        drawing = Drawing(stdscr, filename=filename, width=canvas_width, height=canvas_height, background=-1, palette=palette,
+                          fill_tolerance=args.tolerance, fill_diagonal=args.diagonal_fill, undo_budget=args.undo_budget,
+                          color_metric=args.color_metric, import_colors=args.colors, quantizer=args.quantizer,
+                          render_mode=args.render, truecolor=args.truecolor, tiled=args.tiled)
+    except ValueError as e:  # bad palette file
+        curses.endwin()
+        print(e)
+        exit()
+    if args.project:
+        # the project file is the canvas, no autosave needed
+        try:
+            drawing.open_project(args.project, args.keymap)
+        except (OSError, ValueError) as e:
+            curses.endwin()
+            print(f"Error: {e}")
+            exit(1)
+    else:
+        if args.recover:
+            recovered = Autosave.recover()
+            if recovered:
+                drawing.restore(*recovered)
+
+        # Autosave journal, kept on disk if pix does not exit cleanly
+        drawing.autosave = Autosave()
+        drawing.autosave.snapshot(drawing)
+    drawing.update_cursor()  # Initial cursor update
+    if args.frame_stats:
+        drawing.enable_stats(args.frame_stats)
+    
+    def signal_handler(sig, frame):
+        # the journal stays on disk, the next start offers to recover it
+        if drawing.project:
+            drawing.close_project()
+        else:
+            if drawing.changed_rects:
+                drawing.autosave.write_rects(drawing, drawing.changed_rects)
+            drawing.autosave.flush()
+        curses.endwin()
+        exit(0)
+
+    signal.signal(signal.SIGINT, signal_handler)
+    signal.signal(signal.SIGHUP, signal_handler)
+    signal.signal(signal.SIGTERM, signal_handler)
+
+    while True:
+        key = stdscr.getch()
+        key_time = time.perf_counter()
+        running = handle_input(key, drawing, keymap)
+
+        # Apply the keys that queued up meanwhile (auto-repeat) before drawing,
+        # so holding a key doesn't cost a frame per repeat. Every key is still
+        # applied in order, pen strokes keep all their pixels.
+        stdscr.nodelay(True)
+        batch_start = time.perf_counter()
+        while running and not drawing.clear_screen and time.perf_counter() - batch_start < FRAME_INTERVAL:
+            key = stdscr.getch()
+            if key == -1:
+                break
+            running = handle_input(key, drawing, keymap)
+        stdscr.nodelay(False)
+
+        if not running:
+            break
+        drawing.update_cursor()
+        if drawing.stats:
+            drawing.stats.end_frame(time.perf_counter() - key_time)
+
+    # clean exit, the autosave is not needed anymore
+    if drawing.project:
+        drawing.close_project()
+    else:
+        drawing.autosave.close(remove=True)
@@ -0,0 +1,11 @@
+# Shared setup of the tests, run them with `python -m pytest tests`
+#
+# pix is imported from the checkout and the benchmark helpers (RecordingScreen,
+# fake_curses, bench) from benchmarks/, nothing needs to be installed.
+
+import os
+import sys
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+sys.path.insert(0, os.path.join(ROOT, "benchmarks"))
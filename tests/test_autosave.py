@@ -0,0 +1,93 @@
+# Autosave snapshot and journal, run with `python -m pytest tests`
+
+import os
+
+from pix import Canvas
+from pix.autosave import Autosave
+
+
+def painted(**options):
+    canvas = Canvas(24, 16, palette=None, **options)
+    for i in range(0, 24 * 16, 7):
+        canvas.put_pixel(i % 24, i // 24, i % 5)
+    return canvas
+
+
+def animated(**options):
+    # two frames of two layers, the second frame duplicated from the first
+    canvas = painted(**options)
+    canvas.add_layer()
+    canvas.put_pixel(1, 1, 3)
+    canvas.change_layer_opacity(-40)
+    canvas.duplicate_frame()
+    canvas.put_pixel(2, 2, 4)
+    canvas.frames[1].duration = 250
+    canvas.toggle_layer()
+    canvas.next_layer()
+    return canvas
+
+
+def state(canvas):
+    canvas.frames[canvas.frame_index].active_layer = canvas.active_layer
+    return (canvas.width, canvas.height, list(canvas.colors), canvas.frame_index,
+            [(frame.duration, frame.active_layer,
+              [(layer.name, layer.visible, layer.opacity, bytes(layer.pixels)) for layer in frame.layers])
+             for frame in canvas.frames])
+
+
+def recovered(prefix):
+    canvas = Canvas(palette=None)
+    canvas.restore(*Autosave.recover(prefix))
+    return canvas
+
+
+def test_snapshot_round_trip(tmp_path):
+    prefix = str(tmp_path / "pix.save")
+    for canvas in (painted(), painted(tiled=True), animated(), animated(tiled=True)):
+        autosave = Autosave(prefix)
+        autosave.snapshot(canvas)
+        autosave.close()
+        restored = recovered(prefix)
+        assert state(restored) == state(canvas)
+        assert bytes(restored.view_pixels()) == bytes(canvas.view_pixels())
+
+
+def test_crash_recovers_every_layer_of_every_frame(tmp_path):
+    prefix = str(tmp_path / "pix.save")
+    canvas = animated()
+    autosave = canvas.autosave = Autosave(prefix)
+    autosave.snapshot(canvas)
+    # edits on both layers of both frames, like the editor hands them off
+    for frame in range(2):
+        for _ in range(2):
+            for x in range(5):
+                canvas.put_pixel(x + frame, 3 + canvas.active_layer, 4 + frame)
+                canvas.mark_dirty(x + frame, 3 + canvas.active_layer, x + frame, 3 + canvas.active_layer)
+            canvas.next_layer()  # journals the layer it leaves
+        canvas.next_frame()
+    canvas.put_pixel(9, 9, 2)
+    canvas.mark_dirty(9, 9, 9, 9)
+    autosave.write_rects(canvas, canvas.changed_rects)
+    autosave.flush()
+    # no close(): the files are left as a crash leaves them
+    assert Autosave.exists(prefix)
+    assert state(recovered(prefix)) == state(canvas)
+    autosave.close()
+
+
+def test_a_cut_journal_record_is_ignored(tmp_path):
+    prefix = str(tmp_path / "pix.save")
+    canvas = animated()
+    autosave = Autosave(prefix)
+    autosave.snapshot(canvas)
+    expected = state(canvas)
+    autosave.write(canvas, 2, [(0, b'\x02\x02')])
+    autosave.write(canvas, 3, [(30, b'\x03' * 10)])
+    autosave.close()
+    with open(prefix + ".journal", 'r+b') as file:
+        file.truncate(os.path.getsize(prefix + ".journal") - 4)
+
+    # the whole first record, on the first layer of the second frame, nothing of the cut one
+    name, visible, opacity, pixels = expected[4][1][2][0]
+    expected[4][1][2][0] = (name, visible, opacity, b'\x02\x02' + pixels[2:])
+    assert state(recovered(prefix)) == expected
@@ -0,0 +1,28 @@
+# Smoke run of the benchmark suite, run with `python -m pytest tests`
+#
+# The benchmarks drive the renderer and the canvas directly, a change that
+# breaks them should fail here and not only when someone times a release.
+
+import bench
+from fake_screen import fake_curses
+
+
+def run(function):
+    options = bench.parse_options(["--quick", "--repeat", "1"])
+    with fake_curses():
+        results = function(options)
+    assert results
+    for entry in results:
+        assert entry["repeat"] == 1 and entry["median_ms"] >= 0
+    return results
+
+
+def test_display_view_bench_runs():
+    names = {entry["name"] for entry in run(bench.bench_display_view)}
+    assert {"display_view", "update_cursor_move", "display_view_mode", "display_view_layers",
+            "display_view_truecolor"} <= names
+
+
+def test_edit_benches_run():
+    for function in (bench.bench_fill, bench.bench_shapes, bench.bench_move_block):
+        run(function)
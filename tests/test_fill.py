@@ -0,0 +1,90 @@
+# Bucket fill against a pixel by pixel flood fill, run with `python -m pytest tests`
+
+import random
+from collections import deque
+
+from pix import Canvas
+
+
+def naive_fill(canvas, pixels, x, y, new_index):
+    # breadth first, one pixel at a time, the mirrored seeds like bucket_fill
+    width, height = canvas.width, canvas.height
+    if pixels[y * width + x] == new_index:
+        return pixels  # nothing to do, like bucket_fill
+    old = canvas.colors[pixels[y * width + x]]
+    fillable = {i for i, color in enumerate(canvas.colors[:256])
+                if sum((a - b) ** 2 for a, b in zip(color, old)) <= canvas.fill_tolerance ** 2}
+    seeds = [(x, y)]
+    if canvas.mirror_h:
+        seeds.append((width - 1 - x, y))
+    if canvas.mirror_v:
+        seeds.append((x, height - 1 - y))
+    if canvas.mirror_h and canvas.mirror_v:
+        seeds.append((width - 1 - x, height - 1 - y))
+    steps = [(1, 0), (-1, 0), (0, 1), (0, -1)]
+    if canvas.fill_diagonal:
+        steps += [(1, 1), (1, -1), (-1, 1), (-1, -1)]
+    # the new color can be fillable too, so the filled pixels are remembered
+    done = set()
+    queue = deque(seeds)
+    while queue:
+        px, py = queue.popleft()
+        if (not (0 <= px < width and 0 <= py < height) or (px, py) in done
+                or pixels[py * width + px] not in fillable):
+            continue
+        done.add((px, py))
+        pixels[py * width + px] = new_index
+        queue.extend((px + dx, py + dy) for dx, dy in steps)
+    return pixels
+
+
+def random_canvas(width, height, colors, **options):
+    canvas = Canvas(width, height, palette=None, **options)
+    # blobs rather than noise, so fills reach across rows and around walls
+    canvas.pixels[:] = bytes(random.randrange(colors) if random.random() < 0.3 else 0
+                             for _ in range(width * height))
+    return canvas
+
+
+def test_fill_matches_flood_fill():
+    random.seed(5)
+    # wider than FILL_WINDOW too, so the whole-row path is taken
+    for width, height in ((1, 1), (9, 7), (40, 30), (150, 12)):
+        for diagonal in (False, True):
+            for mirror_h, mirror_v in ((False, False), (True, False), (False, True), (True, True)):
+                for tolerance in (0, 60):
+                    canvas = random_canvas(width, height, 4, fill_diagonal=diagonal, fill_tolerance=tolerance)
+                    # 2 and the fill color 5 are within the tolerance of 0, and already in its regions
+                    canvas.colors[2] = (canvas.colors[0][0] + 30,) + tuple(canvas.colors[0][1:])
+                    canvas.colors[5] = tuple(channel + 20 for channel in canvas.colors[0])
+                    canvas.pixels[:] = canvas.pixels.translate(bytes([0, 1, 2, 5] + list(range(4, 256))))
+                    canvas.mirror_h, canvas.mirror_v = mirror_h, mirror_v
+                    x, y = random.randrange(width), random.randrange(height)
+                    start = bytes(canvas.pixels)
+                    expected = naive_fill(canvas, bytearray(start), x, y, 5)
+                    canvas.bucket_fill(x, y, 5)
+                    assert canvas.pixels == expected, (width, height, diagonal, mirror_h, mirror_v, tolerance)
+
+                    # one undo step puts it all back
+                    canvas.begin_action()
+                    canvas.undo()
+                    assert canvas.pixels == start
+
+
+def test_fill_goes_through_pixels_of_the_new_color():
+    # they are within the tolerance, the pixels behind them are connected
+    canvas = Canvas(5, 1, palette=None, fill_tolerance=60)
+    canvas.colors[0], canvas.colors[1] = (0, 0, 0), (10, 10, 10)
+    canvas.pixels[:] = bytes([0, 0, 1, 0, 0])
+    canvas.bucket_fill(0, 0, 1)
+    assert canvas.pixels == bytes([1, 1, 1, 1, 1])
+
+
+def test_fill_outside_or_with_the_same_color_does_nothing():
+    canvas = random_canvas(8, 8, 3)
+    start = bytes(canvas.pixels)
+    canvas.bucket_fill(-1, 3, 4)
+    canvas.bucket_fill(2, 8, 4)
+    canvas.bucket_fill(2, 2, canvas.pixels[2 * 8 + 2])
+    assert canvas.pixels == start
+    assert canvas.changed_rects == []
@@ -0,0 +1,32 @@
+# Animation frames of the canvas, run with `python -m pytest tests`
+
+from pix import Canvas
+from pix.autosave import Autosave
+
+
+def test_switching_frames_does_not_snapshot(tmp_path):
+    canvas = Canvas(16, 16, palette=None)
+    autosave = canvas.autosave = Autosave(str(tmp_path / "pix.save"))
+    try:
+        autosave.snapshot(canvas)
+        canvas.add_frame()
+        snapshots = []
+        autosave.snapshot = lambda drawing: snapshots.append(Autosave.snapshot(autosave, drawing))
+        for _ in range(10):
+            canvas.next_frame()
+
+        # edits of any frame are journaled on their layer
+        canvas.cursor_x, canvas.cursor_y, canvas.color_pair = 3, 4, 6
+        canvas.draw_pixel()
+        canvas.next_frame()
+        canvas.cursor_x = 5
+        canvas.draw_pixel()
+        autosave.write_rects(canvas, canvas.changed_rects)
+        assert snapshots == []
+        autosave.flush()
+        _, _, _, frames, _ = Autosave.recover(str(tmp_path / "pix.save"))
+        assert [bytes(layers[0][3]) for _, _, layers in frames] == \
+            [bytes(frame.layers[0].pixels) for frame in canvas.frames]
+        assert frames[0][2][0][3][4 * 16 + 5] == frames[1][2][0][3][4 * 16 + 3] == 5
+    finally:
+        autosave.close()
@@ -0,0 +1,78 @@
+# Delta undo/redo history, run with `python -m pytest tests`
+
+from pix import Canvas
+from pix.history import History
+
+
+def draw_steps(canvas, count):
+    # one row per step, returns the pixels after each step
+    states = [bytes(canvas.pixels)]
+    for step in range(count):
+        canvas.fill_spans([(step % canvas.height, 0, canvas.width - 1)], step % 7 + 1)
+        canvas.begin_action()
+        states.append(bytes(canvas.pixels))
+    return states
+
+
+def test_undo_redo_walks_the_steps():
+    canvas = Canvas(16, 16, palette=None)
+    states = draw_steps(canvas, 10)
+    for state in reversed(states[:-1]):
+        canvas.undo()
+        assert canvas.pixels == state
+    canvas.undo()  # nothing left
+    assert canvas.pixels == states[0]
+    for state in states[1:]:
+        canvas.redo()
+        assert canvas.pixels == state
+
+
+def test_the_budget_drops_the_oldest_steps():
+    step_size = 2 * 16 + History.RANGE_OVERHEAD
+    canvas = Canvas(16, 16, palette=None, undo_budget=4 * step_size)
+    states = draw_steps(canvas, 10)
+    history = canvas.history
+    assert len(history.undo_stack) == 4
+    assert history.size == 4 * step_size <= history.budget
+
+    # the four newest steps still undo and redo exactly
+    for state in reversed(states[-5:-1]):
+        canvas.undo()
+        assert canvas.pixels == state
+    canvas.undo()
+    assert canvas.pixels == states[-5]
+    assert history.size == 4 * step_size  # redo steps count too
+    for state in states[-4:]:
+        canvas.redo()
+        assert canvas.pixels == state
+
+    # a new step after undoing drops the redo steps and their bytes
+    canvas.undo()
+    canvas.undo()
+    canvas.fill_spans([(15, 0, 15)], 9)
+    canvas.begin_action()
+    assert history.redo_stack == []
+    assert len(history.undo_stack) == 3
+    assert history.size == 3 * step_size
+
+
+def test_a_step_over_the_budget_is_kept():
+    canvas = Canvas(16, 16, palette=None, undo_budget=10)
+    start = bytes(canvas.pixels)
+    draw_steps(canvas, 3)
+    assert len(canvas.history.undo_stack) == 1
+    canvas.undo()
+    canvas.undo()
+    assert canvas.pixels != start  # the older steps are gone
+
+
+def test_one_step_records_only_the_changed_ranges():
+    canvas = Canvas(64, 64, palette=None)
+    for x in range(0, 64, 2):
+        canvas.put_pixel(x, 10, 3)  # close together: merged into one range
+    canvas.put_pixel(5, 40, 3)
+    canvas.put_pixel(5, 40, 0)  # back to what it was: no range
+    canvas.begin_action()
+    delta, size, _ = canvas.history.undo_stack[-1]
+    assert [(start, len(before)) for start, before, _ in delta] == [(10 * 64, 63)]
+    assert size == 2 * 63 + History.RANGE_OVERHEAD
@@ -0,0 +1,91 @@
+# Memory-mapped .pix projects, run with `python -m pytest tests`
+
+import os
+
+import pytest
+
+from pix import Canvas
+from pix.project import Project
+
+
+def edited_project(path):
+    # a project with three undo steps, the last one undone
+    canvas = Canvas(40, 30, palette=None)
+    canvas.open_project(path, "vim.key")
+    canvas.mirror_h = True
+    for x in range(3):
+        canvas.put_pixel(x, 5, 2 + x)
+        canvas.begin_action()
+    canvas.undo()
+    canvas.set_palette_color(3, (10, 20, 30))
+    return canvas
+
+
+def test_save_and_reopen(tmp_path):
+    path = str(tmp_path / "art.pix")
+    canvas = edited_project(path)
+    pixels = bytes(canvas.pixels)
+    colors = list(canvas.colors)
+    undo, redo = len(canvas.history.undo_stack), len(canvas.history.redo_stack)
+    canvas.close_project()
+
+    reopened = Canvas(palette=None)
+    project = reopened.open_project(path)
+    assert (reopened.width, reopened.height) == (40, 30)
+    assert bytes(reopened.pixels) == pixels
+    assert reopened.colors == colors
+    assert project.keymap == "vim.key"
+    assert reopened.mirror_h and not reopened.mirror_v
+    assert (len(reopened.history.undo_stack), len(reopened.history.redo_stack)) == (undo, redo)
+    # a project is one plane, layers and frames are not added to it
+    reopened.add_layer()
+    reopened.add_frame()
+    assert len(reopened.layers) == len(reopened.frames) == 1
+
+    reopened.redo()
+    assert reopened.pixels[5 * 40 + 2] == 4
+    reopened.undo()
+    reopened.undo()
+    assert reopened.pixels[5 * 40 + 1] == 0
+    reopened.close_project()
+
+
+def test_reopen_after_a_crash_keeps_the_pixels(tmp_path):
+    path = str(tmp_path / "art.pix")
+    canvas = edited_project(path)
+    canvas.save_project()
+    canvas.put_pixel(7, 7, 5)  # drawn after the save, straight into the mapped file
+    pixels = bytes(canvas.pixels)
+    # no close_project(): the file keeps its OPEN flag
+    canvas.project.pixels.flush()
+
+    reopened = Canvas(palette=None)
+    project = reopened.open_project(path)
+    assert project.crashed
+    assert bytes(reopened.pixels) == pixels
+    # the saved journal may not match the pixels anymore, it is dropped
+    assert reopened.history.undo_stack == reopened.history.redo_stack == []
+    reopened.close_project()
+    canvas.project.file.close()
+
+
+def test_a_cut_history_journal_is_ignored(tmp_path):
+    path = str(tmp_path / "art.pix")
+    canvas = edited_project(path)
+    pixels = bytes(canvas.pixels)
+    canvas.close_project()
+    with open(path, 'r+b') as file:
+        file.truncate(os.path.getsize(path) - 3)
+
+    reopened = Canvas(palette=None)
+    reopened.open_project(path)
+    assert bytes(reopened.pixels) == pixels
+    assert reopened.history.undo_stack == reopened.history.redo_stack == []
+    reopened.close_project()
+
+
+def test_not_a_project(tmp_path):
+    path = tmp_path / "art.pix"
+    path.write_bytes(b'PIXS' + bytes(64))
+    with pytest.raises(ValueError):
+        Project.open(str(path))
@@ -0,0 +1,162 @@
+# Renderer checks against a RecordingScreen, run with `python -m pytest tests`
+
+import curses
+import random
+
+from fake_screen import RecordingScreen, fake_curses
+from pix import Canvas
+from pix.stats import FrameStats
+from pix.tui import RENDER_MODES, Drawing
+
+
+def drawing(size=32, **options):
+    # call under fake_curses()
+    return Drawing(RecordingScreen(size + 8, size + 8), width=size, height=size, view_size=size,
+                   palette=None, **options)
+
+
+def test_row_runs_match_cells_on_blank_pixels():
+    # the one slice path of a plain row gives the same cells as cell()
+    with fake_curses():
+        canvas = drawing()
+        canvas.pixels[5 * 32 + 3:5 * 32 + 9] = b'\x04' * 6  # some color among the blank pixels
+        canvas.update_cursor()
+        for y in (1, 5, 16):
+            expected = [canvas.cell(canvas.view_x + x, canvas.view_y + y) for x in range(-1, 32)]
+            assert canvas.row_cells(y, -1, 31) == expected
+
+
+class GridScreen(RecordingScreen):
+    """RecordingScreen that also keeps the character of every cell."""
+
+    def __init__(self, height, width):
+        super().__init__(height, width)
+        self.grid = {}
+
+    def addch(self, y, x, char, attr=0):
+        super().addch(y, x)
+        self.grid[(y, x)] = char
+
+    def addstr(self, y, x, text, attr=0):
+        super().addstr(y, x, text)
+        for i, char in enumerate(text):
+            self.grid[(y, x + i)] = char
+
+
+def test_shorter_hud_text_is_erased_past_the_view():
+    # the L: text reaches past a small view, a full redraw and a shorter text must not leave it there
+    with fake_curses():
+        for mode in RENDER_MODES:
+            screen = GridScreen(40, 80)
+            canvas = Drawing(screen, width=32, height=32, view_size=8, palette=None, render_mode=mode)
+            canvas.add_layer()
+            canvas.update_cursor()
+            long_len = canvas.hud_text_len
+            Canvas.delete_layer(canvas)  # without the confirmation prompt
+            canvas.request_redraw()
+            canvas.update_cursor()
+            past_view = -(-8 // canvas.cell_w)
+            tail = range(max(past_view, canvas.hud_text_len) + 1, long_len + 1)
+            assert all(screen.grid.get((1, x), " ") == " " for x in tail), mode
+
+
+def test_display_view_before_the_first_cursor_update():
+    # benchmarks and scripts draw a new Drawing without update_cursor
+    with fake_curses():
+        for mode in RENDER_MODES:
+            screen = RecordingScreen(40, 40)
+            canvas = Drawing(screen, width=32, height=32, view_size=32, palette=None, render_mode=mode)
+            canvas.display_view()
+            assert screen.calls.get("addstr", 0) + screen.calls.get("addch", 0) > 0, mode
+            assert canvas.view_x % canvas.cell_w == 0 and canvas.view_y % canvas.cell_h == 0
+
+
+class PairScreen(RecordingScreen):
+    """RecordingScreen that keeps the colors each cell was drawn with."""
+
+    def __init__(self, height, width, canvas_pairs):
+        super().__init__(height, width)
+        self.canvas_pairs = canvas_pairs
+        self.grid = {}
+
+    def put(self, y, x, text, attr):
+        pair = attr >> 8  # fake_curses color_pair()
+        colors = {number: key for key, number in self.canvas_pairs().items()}.get(pair)
+        for i in range(len(text)):
+            self.grid[(y, x + i)] = (pair, colors)
+
+    def addch(self, y, x, char, attr=0):
+        super().addch(y, x)
+        self.put(y, x, char, attr)
+
+    def addstr(self, y, x, text, attr=0):
+        super().addstr(y, x, text)
+        self.put(y, x, text, attr)
+
+
+def test_reused_pairs_do_not_recolor_cells_on_screen(monkeypatch):
+    # with few pairs the cache runs out, no cell may keep a pair set up for other colors
+    random.seed(1)
+    with fake_curses():
+        canvas = None
+        screen = PairScreen(24, 40, lambda: canvas.pair_cache)
+        canvas = Drawing(screen, width=32, height=32, view_size=32, palette=None, render_mode="half")
+        monkeypatch.setattr(curses, "COLOR_PAIRS", canvas.next_pair + 12, raising=False)
+        canvas.pixels[:] = bytes(random.randrange(6) for _ in range(32 * 32))
+        canvas.update_cursor()
+
+        def check():
+            current = {number: key for key, number in canvas.pair_cache.items()}
+            for pair, colors in screen.grid.values():
+                if pair in current:
+                    assert current[pair] == colors
+
+        for _ in range(20):
+            x, y = random.randrange(32), random.randrange(32)
+            canvas.pixels[y * 32 + x] = random.randrange(6)
+            canvas.mark_dirty(x, y, x, y)
+            canvas.update_cursor()
+            check()
+            # a cursor move only repaints the cells it leaves and enters
+            canvas.move_cursor(random.choice(["UP", "DOWN", "LEFT", "RIGHT"]))
+            canvas.update_cursor()
+            check()
+
+        # the overview repaints only the cell the cursor left too
+        canvas.toggle_overview()
+        canvas.update_cursor()
+        screen.grid = {}
+        canvas.request_redraw(clear=True)
+        canvas.update_cursor()
+        for _ in range(40):
+            canvas.move_cursor(random.choice(["UP", "DOWN", "LEFT", "RIGHT"]))
+            canvas.update_cursor()
+            check()
+
+
+def test_stats_count_the_cells_drawn():
+    with fake_curses():
+        canvas = drawing(16)
+        canvas.enable_stats(FrameStats())
+        canvas.update_cursor()
+        canvas.stats.end_frame(0.0)
+        frame = canvas.stats.last
+        assert frame["addstr"] + frame["addch"] > 0
+        assert frame["cells"] >= 16 * 16  # the whole view on the first frame
+        assert "cells:{}".format(frame["cells"]) in canvas.stats.live_text()
+
+
+def test_stats_count_the_pixels_written():
+    with fake_curses():
+        canvas = drawing(16)
+        canvas.enable_stats(FrameStats())
+        canvas.update_cursor()
+        canvas.stats.end_frame(0.0)
+        assert canvas.stats.last["put_pixel"] == 0
+        canvas.draw_pixel()
+        canvas.fill_spans([(2, 0, 9)], 3)
+        canvas.bucket_fill(0, 8, 4)  # the blank rows below the span
+        canvas.update_cursor()
+        canvas.stats.end_frame(0.0)
+        assert canvas.stats.last["put_pixel"] >= 1 + 10 + 16 * 13
+        assert "px:{}".format(canvas.stats.last["put_pixel"]) in canvas.stats.live_text()
@@ -0,0 +1,32 @@
+# Headless script commands, run with `python -m pytest tests`
+
+import os
+
+from pix import Canvas
+from pix.script import apply_script, output_paths, parse_script
+
+
+def test_same_names_in_different_folders_get_different_outputs(tmp_path):
+    out = str(tmp_path / "out")
+    inputs = [str(tmp_path / "a" / "x.png"), str(tmp_path / "b" / "x.png"), str(tmp_path / "a" / "y.png")]
+    assert output_paths(inputs, out) == [os.path.join(out, "a", "x.png"), os.path.join(out, "b", "x.png"),
+                                         os.path.join(out, "a", "y.png")]
+    # one folder: just the names
+    assert output_paths(inputs[::2], out) == [os.path.join(out, "x.png"), os.path.join(out, "y.png")]
+
+
+def test_swap_keeps_the_color_numbers():
+    for tiled in (False, True):
+        canvas = Canvas(8, 8, palette=None, tiled=tiled)
+        red, blue = canvas.colors[4], (1, 2, 3)
+        script = ["color 4", "rect 0 0 3 3",
+                  "swap #{:02x}{:02x}{:02x} #010203".format(*red),
+                  "color 4", "dot 6 6",  # still the old color 4
+                  "swap #000000 #010203"]
+        apply_script(canvas, parse_script(script))
+        blue_index = canvas.colors.index(blue)
+        assert canvas.colors[4] == red
+        assert canvas.pixels[6 * 8 + 6] == 4
+        assert all(canvas.pixels[y * 8 + x] == blue_index for x in range(4) for y in range(4))
+        # the blank pixels were black
+        assert canvas.pixels[7 * 8] == blue_index
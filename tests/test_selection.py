@@ -0,0 +1,110 @@
+# Selection tools of the canvas, run with `python -m pytest tests`
+
+from pix import Canvas
+
+
+def test_lasso_without_a_path_selects_nothing():
+    canvas = Canvas(16, 16, palette=None)
+    assert canvas.lasso_spans([]) == []
+    assert canvas.lasso_spans([(3, 4)]) == [(4, 3, 3)]
+
+
+def test_closing_an_empty_lasso_drops_the_selection():
+    canvas = Canvas(16, 16, palette=None)
+    canvas.tool_id = 8
+    canvas.select_lasso()
+    canvas.select_lasso()  # closed before the cursor added a point
+    assert canvas.selection is None
+    assert not canvas.pen_down
+
+
+def covered(spans):
+    return {(x, y) for y, x0, x1 in spans for x in range(x0, x1 + 1)}
+
+
+def test_rect_selection_is_clipped_to_the_canvas():
+    canvas = Canvas(16, 12, palette=None)
+    canvas.tool_id = 7
+    canvas.cursor_x, canvas.cursor_y = 13, 9
+    canvas.perform_action()
+    canvas.cursor_x, canvas.cursor_y = 3, 2
+    canvas.perform_action()
+    assert canvas.selection == [(y, 3, 13) for y in range(2, 10)]
+    assert canvas.merge_spans(canvas.rect_spans(-3, -2, 4, 20)) == [(y, 0, 4) for y in range(12)]
+
+
+def test_lasso_selects_the_inside_and_the_path():
+    canvas = Canvas(20, 20, palette=None)
+    diamond = [(8, 2), (14, 8), (8, 14), (2, 8)]
+    spans = canvas.lasso_spans(diamond)
+    assert covered(spans) == {(x, y) for x in range(20) for y in range(20) if abs(x - 8) + abs(y - 8) <= 6}
+    # sorted, one span per run, within the canvas
+    assert spans == canvas.merge_spans(spans)
+    assert covered(canvas.lasso_spans([(-4, -4), (5, -4), (5, 5), (-4, 5)])) == \
+        {(x, y) for x in range(6) for y in range(6)}
+
+
+def painted(width, height):
+    canvas = Canvas(width, height, palette=None)
+    canvas.pixels[:] = bytes((x * 3 + y * 5) % 7 + 1 for y in range(height) for x in range(width))
+    return canvas
+
+
+def naive_paste(canvas, pixels, clip_pixels, x, y):
+    # clip_pixels: (dx, dy) -> index of every pixel the clip covers
+    for (dx, dy), index in clip_pixels.items():
+        if 0 <= x + dx < canvas.width and 0 <= y + dy < canvas.height:
+            pixels[(y + dy) * canvas.width + x + dx] = index
+    return pixels
+
+
+def test_cut_and_paste_a_lasso_clip():
+    canvas = painted(20, 20)
+    start = bytes(canvas.pixels)
+    canvas.selection = canvas.lasso_spans([(8, 2), (14, 8), (8, 14), (2, 8)])
+    shape = {(x - 2, y - 2): start[y * 20 + x] for x, y in covered(canvas.selection)}
+    canvas.cut_selection()
+    assert all(canvas.pixels[y * 20 + x] == 0 for x, y in covered(canvas.selection))
+
+    cut = bytes(canvas.pixels)
+    for x, y in ((0, 0), (10, 9), (-5, 3), (15, -4), (19, 19)):
+        canvas.cursor_x, canvas.cursor_y = x, y
+        canvas.paste_at(x, y)
+        assert canvas.pixels == naive_paste(canvas, bytearray(cut), shape, x, y), (x, y)
+        canvas.pixels[:] = cut
+
+    canvas.cursor_x, canvas.cursor_y = 10, 9
+    canvas.paste()
+    canvas.undo()
+    assert canvas.pixels == cut
+    canvas.undo()
+    assert canvas.pixels == start
+
+
+def test_stamp_pastes_the_clip_along_the_path():
+    canvas = painted(24, 16)
+    canvas.selection = canvas.merge_spans(canvas.rect_spans(1, 1, 3, 2))
+    canvas.copy_selection()
+    canvas.flip_clipboard_horizontal()
+    canvas.rotate_clipboard()  # 2 wide, 3 high
+    clip = canvas.clipboard
+    assert (clip.width, clip.height) == (2, 3)
+    block = [[canvas.pixels[(1 + y) * 24 + 1 + x] for x in range(3)] for y in range(2)]
+    flipped = [row[::-1] for row in block]
+    assert clip.data == bytes(flipped[1 - dx][dy] for dy in range(3) for dx in range(2))
+    shape = {(dx, dy): clip.data[dy * clip.width + dx] for dy in range(3) for dx in range(2)}
+
+    canvas.begin_action()
+    start = bytes(canvas.pixels)
+    expected = bytearray(start)
+    canvas.tool_id = 9
+    canvas.cursor_x, canvas.cursor_y = 20, 12
+    canvas.perform_action()  # pen down
+    for x, y in ((20, 12), (21, 13), (22, 14), (23, 15), (23, 15), (-1, 5)):
+        canvas.cursor_x, canvas.cursor_y = x, y
+        canvas.pen_step()
+        naive_paste(canvas, expected, shape, x, y)
+    canvas.perform_action()  # pen up
+    assert canvas.pixels == expected
+    canvas.undo()  # the whole stroke is one step
+    assert canvas.pixels == start